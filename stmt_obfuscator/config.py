@@ -23,6 +23,10 @@ CACHE_DIR.mkdir(exist_ok=True)
 OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
 DEFAULT_MODEL = os.environ.get("OLLAMA_MODEL", "mistral:7b-instruct")
 FALLBACK_MODEL = "llama3:8b"
+# How long Ollama keeps the model loaded after a request
+OLLAMA_KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "5m")
+# Number of requests Ollama serves at once (the server's OLLAMA_NUM_PARALLEL)
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
 
 # PII detection configuration
 CONFIDENCE_THRESHOLD = 0.85
@@ -42,6 +46,13 @@ PDF_INCLUDE_METADATA = True
 PDF_FONT_FALLBACKS = ["Times-Roman", "Courier", "Symbol", "ZapfDingbats"]
 PDF_PRESERVE_LAYOUT = True  # Whether to preserve the original document layout
 
+# PDF preview configuration
+# Rendered previews contain the document content, so they are only cached on
+# disk when explicitly enabled
+PREVIEW_DISK_CACHE_ENABLED = False
+PREVIEW_CACHE_DIR = CACHE_DIR / "previews"
+PREVIEW_DISK_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 256MB
+
 # UI configuration
 UI_THEME = "light"  # "light" or "dark"
 UI_FONT_SIZE = 12
@@ -165,8 +165,8 @@ class OutputGenerator:
             # Format the document
             pdf_doc = self.pdf_formatter.format_document(document, pdf_doc)
             
-            # Save the PDF
-            pdf_doc.save(output_path)
+            # Save the PDF with compression and garbage collection
+            self.pdf_formatter.finalize(pdf_doc, output_path)
             pdf_doc.close()
             
             logger.info(f"Generated PDF output at {output_path}")
@@ -5,8 +5,14 @@ This module handles the formatting of PDF output files.
 """
 
 import logging
+import re
+from array import array
+from bisect import bisect_right
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import fitz  # PyMuPDF
 
@@ -37,6 +43,19 @@ DEFAULT_FONT_FALLBACKS = PDF_FONT_FALLBACKS + [
 # Remove duplicates while preserving order
 DEFAULT_FONT_FALLBACKS = list(dict.fromkeys(DEFAULT_FONT_FALLBACKS))
 
+# Title shown at the top of the first page
+HEADER_TITLE = "Obfuscated Bank Statement"
+
+# Options for writing formatted PDFs: drop and deduplicate unused objects,
+# compress all streams and clean up page contents
+SAVE_OPTIONS = {
+    "garbage": 4,
+    "deflate": True,
+    "deflate_images": True,
+    "deflate_fonts": True,
+    "clean": True,
+}
+
 # Unicode block ranges for different scripts
 UNICODE_BLOCKS = {
     "Basic Latin": (0x0000, 0x007F),
@@ -54,6 +73,12 @@ UNICODE_BLOCKS = {
     "Supplemental Mathematical Operators": (0x2A00, 0x2AFF),
 }
 
+# UNICODE_BLOCKS as parallel arrays sorted by start code point, for bisection
+_SORTED_BLOCKS = sorted(UNICODE_BLOCKS.items(), key=lambda item: item[1][0])
+_BLOCK_NAMES = [block_name for block_name, _ in _SORTED_BLOCKS]
+_BLOCK_STARTS = array("i", (start for _, (start, _) in _SORTED_BLOCKS))
+_BLOCK_ENDS = array("i", (end for _, (_, end) in _SORTED_BLOCKS))
+
 # Map of Unicode blocks to appropriate fonts
 BLOCK_TO_FONT_MAP = {
     "Greek and Coptic": "Symbol",
@@ -66,13 +91,40 @@ BLOCK_TO_FONT_MAP = {
 }
 
 
+@lru_cache(maxsize=65536)
+def _measure(text: str, font: str, fontsize: float) -> float:
+    """
+    Measure the width of text in a font, memoised across the whole process.
+
+    Args:
+        text: The text to measure
+        font: The font name to use
+        fontsize: The font size to use
+
+    Returns:
+        The width of the text in points
+    """
+    return fitz.get_text_length(text, fontname=font, fontsize=fontsize)
+
+
 class PDFFormatter:
     """
     Formatter for PDF output.
 
     This class handles the formatting of obfuscated bank statements into PDF format.
+
+    format_document returns a fully populated document: all pages are written
+    before it returns and nothing mutates them afterwards. Each text insertion
+    adds a content stream to its page; these are merged once per page when the
+    document is written with finalize or to_bytes, so callers should render
+    from the serialized output rather than from the live document.
     """
 
+    # Text widths shared by all formatters, keyed by font configuration, so
+    # measurements stay warm across documents
+    _GLOBAL_WIDTH_CACHE: Dict[Tuple[Any, ...], Tuple[float, str]] = {}
+    _GLOBAL_WIDTH_CACHE_MAX_SIZE = 65536
+
     def __init__(
         self,
         font: str = PDF_DEFAULT_FONT,
@@ -104,7 +156,7 @@ class PDFFormatter:
         self.margin = margin
         self.include_timestamp = include_timestamp
         self.include_metadata = include_metadata
-        self.font_fallbacks = font_fallbacks or DEFAULT_FONT_FALLBACKS
+        self.font_fallbacks = list(font_fallbacks or DEFAULT_FONT_FALLBACKS)
         self.preserve_layout = preserve_layout
         self.layout_detail_level = layout_detail_level
 
@@ -112,8 +164,73 @@ class PDFFormatter:
         if self.font in self.font_fallbacks:
             self.font_fallbacks.remove(self.font)
 
-        # Create a font cache to avoid repeated lookups
-        self.font_cache = {}
+        # Load font objects once so text writers do not resolve names per call
+        self._font_objs: Dict[str, fitz.Font] = {}
+        for font_name in [self.font] + self.font_fallbacks:
+            try:
+                self._font_objs[font_name] = fitz.Font(fontname=font_name)
+            except Exception as e:
+                logger.debug(f"Could not load font {font_name}: {e}")
+
+        # Use the shared font cache to avoid repeated lookups
+        self.font_cache = PDFFormatter._GLOBAL_WIDTH_CACHE
+        self._font_key = (self.font, tuple(self.font_fallbacks))
+
+        # Fallback to use for Cyrillic; these fonts might support some Cyrillic
+        self._cyrillic_font = next(
+            (f for f in self.font_fallbacks if f in ("Times-Roman", "Helvetica")),
+            self.font,
+        )
+
+        # Resolve the font for each Unicode block once, parallel to _BLOCK_STARTS
+        self._block_fonts = [
+            self._resolve_block_font(block_name) for block_name in _BLOCK_NAMES
+        ]
+
+        # Character class matching runs of characters that need a fallback font
+        fallback_ranges = "".join(
+            f"{re.escape(chr(start))}-{re.escape(chr(end))}"
+            for start, end, font in zip(_BLOCK_STARTS, _BLOCK_ENDS, self._block_fonts)
+            if font != self.font
+        )
+        self._fallback_run_re = (
+            re.compile(f"[{fallback_ranges}]+") if fallback_ranges else None
+        )
+
+        # Lookup table for the Latin-1 range and a cache for everything else
+        self._latin1_font_lut = [self._lookup_block_font(cp) for cp in range(256)]
+        self._char_font_cache: Dict[str, str] = {}
+
+        # ASCII advance widths at the sizes used for body, header and footer text.
+        # Building the tables also warms the measurement cache for ASCII.
+        try:
+            self._ascii_advances = {
+                size: array(
+                    "d", (_measure(chr(cp), self.font, size) for cp in range(128))
+                )
+                for size in (self.font_size, self.font_size + 2, self.font_size - 2)
+            }
+        except Exception as e:
+            logger.debug(f"Could not build ASCII advance tables for {self.font}: {e}")
+            self._ascii_advances = {}
+
+        # Sizes at which all digits share one advance width
+        self._tabular_digit_sizes = {
+            size
+            for size, advances in self._ascii_advances.items()
+            if len({advances[ord(digit)] for digit in "0123456789"}) == 1
+        }
+
+        # Width of the header title, which is all the header shows without a
+        # timestamp
+        self._header_const_width = (
+            self._fast_ascii_width(HEADER_TITLE, self.font_size + 2)
+            if self.font_size + 2 in self._ascii_advances
+            else None
+        )
+
+        # Width of a single space at the body font size, used by wrap_text
+        self._space_width, _ = self.get_text_width_with_fallback(" ", self.font_size)
         
         # Initialize layout analyzer if layout preservation is enabled
         self.layout_analyzer = LayoutAnalyzer(detail_level=layout_detail_level) if preserve_layout else None
@@ -145,14 +262,37 @@ class PDFFormatter:
                 return self.format_document_standard(document, pdf_doc)
 
         except Exception as e:
-            logger.error(f"Error formatting PDF document: {e}")
-            import traceback
-
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error formatting PDF document: {e}")
 
             # Return the PDF document even if there was an error
             return pdf_doc
-            
+
+    def finalize(self, pdf_doc: fitz.Document, path: Union[str, Path]) -> None:
+        """
+        Save a formatted PDF document with compression enabled.
+
+        The same fonts are embedded on every page, so garbage collection of
+        duplicate objects and stream compression substantially reduce the size
+        of the written file.
+
+        Args:
+            pdf_doc: The formatted PDF document to save
+            path: The path to write the PDF to
+        """
+        pdf_doc.save(str(path), **SAVE_OPTIONS)
+
+    def to_bytes(self, pdf_doc: fitz.Document) -> bytes:
+        """
+        Serialize a formatted PDF document with the same options as finalize.
+
+        Args:
+            pdf_doc: The formatted PDF document to serialize
+
+        Returns:
+            The compressed PDF as bytes
+        """
+        return pdf_doc.tobytes(**SAVE_OPTIONS)
+
     def format_document_standard(
         self, document: Dict[str, Any], pdf_doc: fitz.Document
     ) -> fitz.Document:
@@ -232,9 +372,7 @@ class PDFFormatter:
                 return pdf_doc
                 
         except Exception as e:
-            logger.error(f"Error in layout preservation: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+            logger.exception(f"Error in layout preservation: {e}")
             
             # Fall back to standard formatting
             logger.info("Falling back to standard formatting")
@@ -299,9 +437,7 @@ class PDFFormatter:
         footer_text = f"Page {page_num + 1} of {total_pages}"
         
         # Calculate position (centered at bottom of page)
-        text_width, _ = self.get_text_width_with_fallback(
-            footer_text, self.font_size - 2
-        )
+        text_width = self._page_label_width(page_num, total_pages, self.font_size - 2)
         x = (page.rect.width - text_width) / 2
         y = page.rect.height - self.margin / 2
         
@@ -314,6 +450,33 @@ class PDFFormatter:
             color=(0, 0, 0),
         )
     
+    def _page_label_width(
+        self, page_num: int, total_pages: int, fontsize: int
+    ) -> float:
+        """
+        Measure a "Page N of M" label.
+
+        When the primary font's digits all share one advance width, as in the
+        base-14 text fonts, every label with the same number of page digits has
+        the same width, so a zero-filled template is measured (and cached) once
+        per digit count instead of measuring each page's label.
+
+        Args:
+            page_num: The page number (0-based)
+            total_pages: The total number of pages
+            fontsize: The font size to use
+
+        Returns:
+            The width of the label in points
+        """
+        page_label = str(page_num + 1)
+        if fontsize in self._tabular_digit_sizes:
+            page_label = "0" * len(page_label)
+        width, _ = self.get_text_width_with_fallback(
+            f"Page {page_label} of {total_pages}", fontsize
+        )
+        return width
+
     def add_metadata_page(self, pdf_doc: fitz.Document, document: Dict[str, Any]) -> None:
         """
         Add a page with metadata information.
@@ -377,22 +540,26 @@ class PDFFormatter:
         """
         try:
             page = pdf_doc[0]  # Get the first page
+            page_width = page.rect.width
+            header_size = self.font_size + 2
 
-            # Set up the header text
-            header_text = "Obfuscated Bank Statement"
-
-            # Add timestamp if enabled
+            # Set up the header text, adding the timestamp if enabled. The
+            # current time is only formatted when the metadata has none.
             if self.include_timestamp:
-                timestamp = document.get("metadata", {}).get(
-                    "obfuscation_timestamp", datetime.now().isoformat()
-                )
-                header_text += f"\nGenerated: {timestamp}"
+                metadata = document.get("metadata") or {}
+                timestamp = metadata.get("obfuscation_timestamp")
+                if timestamp is None:
+                    timestamp = datetime.now().isoformat()
+                header_text = f"{HEADER_TITLE}\nGenerated: {timestamp}"
+            else:
+                header_text = HEADER_TITLE
 
             # Calculate position (centered at top of page)
-            text_width = fitz.get_text_length(
-                header_text, fontname=self.font, fontsize=self.font_size + 2
-            )
-            x = (page.rect.width - text_width) / 2
+            if not self.include_timestamp and self._header_const_width is not None:
+                text_width = self._header_const_width
+            else:
+                text_width = _measure(header_text, self.font, header_size)
+            x = (page_width - text_width) / 2
             y = self.margin / 2
 
             # Insert the text with font fallback support
@@ -400,14 +567,14 @@ class PDFFormatter:
                 page,
                 (x, y),
                 header_text,
-                fontsize=self.font_size + 2,
+                fontsize=header_size,
                 color=(0, 0, 0),
             )
 
             # Add a separator line
             page.draw_line(
                 (self.margin, self.margin),
-                (page.rect.width - self.margin, self.margin),
+                (page_width - self.margin, self.margin),
                 color=(0, 0, 0),
                 width=0.5,
             )
@@ -427,91 +594,146 @@ class PDFFormatter:
         Returns:
             A list of wrapped lines
         """
+        return list(self._wrap_iter(text, page_width, start_x))
+
+    def _wrap_iter(self, text: str, page_width: float, start_x: float) -> Iterator[str]:
+        """
+        Wrap text to fit within page margins, yielding lines as they are built.
+
+        Args:
+            text: The text to wrap
+            page_width: The width of the page
+            start_x: The starting x position (left margin)
+
+        Yields:
+            Wrapped lines, with empty strings for blank lines
+        """
         available_width = page_width - start_x - self.margin
-        lines = []
+        space_width = self._space_width
 
         # Split text into paragraphs
         paragraphs = text.split("\n")
 
         for paragraph in paragraphs:
             if not paragraph:  # Handle empty lines
-                lines.append("")
+                yield ""
                 continue
 
             # Initialize variables for line building
             current_line = []
             current_width = 0
 
-            # Split paragraph into words
+            # Split paragraph into words and measure each distinct word once
             words = paragraph.split()
+            word_widths = self._measure_words(words, self.font_size)
 
-            for word in words:
-                # Calculate word width with font fallback consideration
-                word_width, _ = self.get_text_width_with_fallback(word, self.font_size)
-
+            for word, word_width in zip(words, word_widths):
                 # Handle special case: very long words (longer than available width)
                 if word_width > available_width:
                     # If we have content in the current line, add it first
                     if current_line:
-                        lines.append(" ".join(current_line))
+                        yield " ".join(current_line)
                         current_line = []
                         current_width = 0
 
                     # Split the long word
                     remaining_word = word
-                    while remaining_word:
+                    while remaining_word and word_width > available_width:
+                        # Find the maximum characters that can fit
+                        i = self._fit_prefix_length(remaining_word, available_width)
+                        yield remaining_word[:i]
+                        remaining_word = remaining_word[i:]
                         word_width, _ = self.get_text_width_with_fallback(
                             remaining_word, self.font_size
                         )
-                        if word_width <= available_width:
-                            break
-                        # Find the maximum characters that can fit
-                        for i in range(len(remaining_word), 0, -1):
-                            segment = remaining_word[:i]
-                            segment_width, _ = self.get_text_width_with_fallback(
-                                segment, self.font_size
-                            )
-                            if segment_width <= available_width:
-                                lines.append(segment)
-                                remaining_word = remaining_word[i:]
-                                break
-                        # Safeguard against infinite loops
-                        if i == 1:
-                            lines.append(remaining_word[0])
-                            remaining_word = remaining_word[1:]
 
                     # Add any remaining part of the word
                     if remaining_word:
                         current_line = [remaining_word]
-                        current_width, _ = self.get_text_width_with_fallback(
-                            remaining_word, self.font_size
-                        )
-                else:
-                    # Check if adding this word would exceed the available width
-                    space_width, _ = self.get_text_width_with_fallback(
-                        " ", self.font_size
-                    )
-                    if (
-                        current_line
-                        and current_width + space_width + word_width > available_width
-                    ):
-                        # Line would be too long, start a new line
-                        lines.append(" ".join(current_line))
-                        current_line = [word]
                         current_width = word_width
-                    else:
-                        # Add word to current line
-                        current_line.append(word)
-                        # Add space width if not the first word
-                        if len(current_line) > 1:
-                            current_width += space_width
-                        current_width += word_width
+                elif not current_line:
+                    # First word of the line
+                    current_line.append(word)
+                    current_width = word_width
+                elif current_width + space_width + word_width > available_width:
+                    # Line would be too long, start a new line
+                    yield " ".join(current_line)
+                    current_line = [word]
+                    current_width = word_width
+                else:
+                    # Add word, preceded by a space, to the current line
+                    current_line.append(word)
+                    current_width += space_width + word_width
 
             # Add the last line of the paragraph
             if current_line:
-                lines.append(" ".join(current_line))
+                yield " ".join(current_line)
+
+    def _fit_prefix_length(self, word: str, available_width: float) -> int:
+        """
+        Find the longest prefix of a word that fits within the available width.
+
+        Prefix widths grow monotonically with length, so the split point is
+        found by binary search rather than by measuring every prefix.
+
+        Args:
+            word: The word to split
+            available_width: The width the prefix has to fit in
+
+        Returns:
+            The length of the longest fitting prefix, at least 1 so that
+            splitting always makes progress
+        """
+        lo, hi = 1, len(word)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            width, _ = self.get_text_width_with_fallback(word[:mid], self.font_size)
+            if width <= available_width:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def _measure_words(self, words: List[str], fontsize: int) -> List[float]:
+        """
+        Measure a sequence of words, measuring each distinct word only once.
+
+        Statements repeat many tokens (dates, currency codes, masked values), so
+        widths are looked up per unique word and mapped back onto the sequence.
+
+        Args:
+            words: The words to measure
+            fontsize: The font size to use
+
+        Returns:
+            A list with the width of each word, in the same order as ``words``
+        """
+        widths = {}
+        for word in words:
+            if word not in widths:
+                if word.isascii() and fontsize in self._ascii_advances:
+                    widths[word] = self._fast_ascii_width(word, fontsize)
+                else:
+                    widths[word], _ = self.get_text_width_with_fallback(word, fontsize)
+        return [widths[word] for word in words]
+
+    def _fast_ascii_width(self, text: str, fontsize: int) -> float:
+        """
+        Measure pure ASCII text by summing precomputed glyph advances.
 
-        return lines
+        The base-14 fonts have no kerning, so this matches fitz.get_text_length
+        without crossing into PyMuPDF.
+
+        Args:
+            text: The ASCII text to measure
+            fontsize: The font size to use; must have an advance table
+
+        Returns:
+            The width of the text in points
+        """
+        # Index the table with the encoded bytes so the loop runs in C
+        advances = self._ascii_advances[fontsize]
+        return sum(map(advances.__getitem__, text.encode("ascii")))
 
     def add_content(self, pdf_doc: fitz.Document, document: Dict[str, Any]) -> None:
         """
@@ -534,16 +756,22 @@ class PDFFormatter:
             y = self.margin * 1.5  # Start below the header
             line_height = self.font_size * 1.2  # Add some spacing between lines
 
-            # Wrap text to fit within margins
-            wrapped_lines = self.wrap_text(text, page.rect.width, start_x)
+            # Lines that only need the primary font are collected in a
+            # TextWriter and written to the page in one operation
+            body_font = self._font_objs.get(self.font)
+            writer = fitz.TextWriter(page.rect) if body_font else None
 
-            # Insert the wrapped text
-            for line in wrapped_lines:
+            # Insert the text as it is wrapped to fit within margins
+            for line in self._wrap_iter(text, page.rect.width, start_x):
                 # Check if we need to add a new page
                 if y + line_height > page.rect.height - self.margin * 2:
-                    # Create a new page
+                    # Flush the finished page and create a new one
+                    if writer is not None:
+                        writer.write_text(page, color=(0, 0, 0))
                     page = pdf_doc.new_page()
                     page_num += 1
+                    if writer is not None:
+                        writer = fitz.TextWriter(page.rect)
                     y = self.margin * 1.5  # Reset y position
 
                 # Skip empty lines (just advance y position)
@@ -551,23 +779,33 @@ class PDFFormatter:
                     y += line_height
                     continue
 
-                # Insert the line with font fallback support
-                self.insert_text_with_fallback(
-                    page,
-                    (start_x, y),
-                    line,
-                    fontsize=self.font_size,
-                    color=(0, 0, 0),
-                )
+                if writer is not None and not self._needs_fallback(line):
+                    writer.append(
+                        (start_x, y), line, font=body_font, fontsize=self.font_size
+                    )
+                else:
+                    # Flush pending lines first so the page keeps reading order
+                    if writer is not None:
+                        writer.write_text(page, color=(0, 0, 0))
+                        writer = fitz.TextWriter(page.rect)
+
+                    # Insert the line with font fallback support
+                    self.insert_text_with_fallback(
+                        page,
+                        (start_x, y),
+                        line,
+                        fontsize=self.font_size,
+                        color=(0, 0, 0),
+                    )
 
                 # Move to the next line
                 y += line_height
 
-        except Exception as e:
-            logger.error(f"Error adding content to PDF: {e}")
-            import traceback
+            if writer is not None:
+                writer.write_text(page, color=(0, 0, 0))
 
-            logger.error(f"Traceback: {traceback.format_exc()}")
+        except Exception as e:
+            logger.exception(f"Error adding content to PDF: {e}")
 
     def add_footer(self, pdf_doc: fitz.Document, document: Dict[str, Any]) -> None:
         """
@@ -578,56 +816,88 @@ class PDFFormatter:
             document: The document containing the data
         """
         try:
-            # Add footer to each page
-            for page_num in range(len(pdf_doc)):
-                page = pdf_doc[page_num]
-
-                # Add a separator line
-                page.draw_line(
-                    (self.margin, page.rect.height - self.margin * 1.5),
-                    (
-                        page.rect.width - self.margin,
-                        page.rect.height - self.margin * 1.5,
-                    ),
-                    color=(0, 0, 0),
-                    width=0.5,
-                )
-
-                # Add page number
-                footer_text = f"Page {page_num + 1} of {len(pdf_doc)}"
-
-                # Add metadata if enabled
-                if (
-                    self.include_metadata and page_num == len(pdf_doc) - 1
-                ):  # Only on last page
-                    metadata = document.get("metadata", {})
-                    if metadata:
-                        footer_text += "\n\nMetadata:"
-                        for key, value in metadata.items():
-                            if (
-                                key != "obfuscation_timestamp"
-                            ):  # Already shown in header
-                                footer_text += f"\n{key}: {value}"
-
-                # Calculate position (right-aligned at bottom of page)
-                text_width, _ = self.get_text_width_with_fallback(
-                    footer_text, self.font_size - 2
-                )
-                x = page.rect.width - self.margin - text_width
-                y = page.rect.height - self.margin
+            total_pages = len(pdf_doc)
+            footer_size = self.font_size - 2
+            separator_offset = self.margin * 1.5
+
+            # Build the metadata block once; it is only added on the last page
+            metadata_text = ""
+            if self.include_metadata:
+                metadata = document.get("metadata", {})
+                if metadata:
+                    metadata_text = "\n\nMetadata:" + "".join(
+                        f"\n{key}: {value}"
+                        for key, value in metadata.items()
+                        if key != "obfuscation_timestamp"  # Already shown in header
+                    )
 
-                # Insert the text with font fallback support
-                self.insert_text_with_fallback(
-                    page,
-                    (x, y),
-                    footer_text,
-                    fontsize=self.font_size - 2,
-                    color=(0, 0, 0),
+            # Add footer to each page. Pages are rendered sequentially because
+            # MuPDF does not support concurrent access to one document.
+            for page_num in range(total_pages):
+                self._render_footer_for_page(
+                    pdf_doc[page_num],
+                    page_num,
+                    total_pages,
+                    metadata_text if page_num == total_pages - 1 else "",
+                    footer_size,
+                    separator_offset,
                 )
 
         except Exception as e:
             logger.error(f"Error adding footer to PDF: {e}")
 
+    def _render_footer_for_page(
+        self,
+        page: fitz.Page,
+        page_num: int,
+        total_pages: int,
+        extra_text: str,
+        footer_size: int,
+        separator_offset: float,
+    ) -> None:
+        """
+        Draw the footer separator and text on a single page.
+
+        Args:
+            page: The PDF page to add the footer to
+            page_num: The page number (0-based)
+            total_pages: The total number of pages
+            extra_text: Text to append after the page number, or an empty string
+            footer_size: The font size of the footer text
+            separator_offset: Distance of the separator line from the page bottom
+        """
+        page_rect = page.rect
+
+        # Add a separator line
+        separator_y = page_rect.height - separator_offset
+        page.draw_line(
+            (self.margin, separator_y),
+            (page_rect.width - self.margin, separator_y),
+            color=(0, 0, 0),
+            width=0.5,
+        )
+
+        # Add page number, plus any extra text
+        footer_text = f"Page {page_num + 1} of {total_pages}"
+        if extra_text:
+            footer_text += extra_text
+            text_width, _ = self.get_text_width_with_fallback(footer_text, footer_size)
+        else:
+            text_width = self._page_label_width(page_num, total_pages, footer_size)
+
+        # Calculate position (right-aligned at bottom of page)
+        x = page_rect.width - self.margin - text_width
+        y = page_rect.height - self.margin
+
+        # Insert the text with font fallback support
+        self.insert_text_with_fallback(
+            page,
+            (x, y),
+            footer_text,
+            fontsize=footer_size,
+            color=(0, 0, 0),
+        )
+
     def get_text_width_with_fallback(
         self, text: str, fontsize: int
     ) -> Tuple[float, str]:
@@ -645,13 +915,25 @@ class PDFFormatter:
             return 0.0, self.font
 
         # Try to get from cache first
-        cache_key = f"{text}:{fontsize}"
+        cache_key = (self._font_key, text, fontsize)
         if cache_key in self.font_cache:
             return self.font_cache[cache_key]
+        if len(self.font_cache) >= self._GLOBAL_WIDTH_CACHE_MAX_SIZE:
+            self.font_cache.clear()
+
+        # ASCII text never needs a fallback once the primary font is known to
+        # measure, so skip the exception handling and fallback scan entirely
+        if self._ascii_advances and text.isascii():
+            if fontsize in self._ascii_advances:
+                width = self._fast_ascii_width(text, fontsize)
+            else:
+                width = _measure(text, self.font, fontsize)
+            self.font_cache[cache_key] = (width, self.font)
+            return width, self.font
 
         # First try with the primary font
         try:
-            width = fitz.get_text_length(text, fontname=self.font, fontsize=fontsize)
+            width = _measure(text, self.font, fontsize)
             self.font_cache[cache_key] = (width, self.font)
             return width, self.font
         except Exception as e:
@@ -664,9 +946,7 @@ class PDFFormatter:
         # Try each fallback font
         for fallback_font in self.font_fallbacks:
             try:
-                width = fitz.get_text_length(
-                    text, fontname=fallback_font, fontsize=fontsize
-                )
+                width = _measure(text, fallback_font, fontsize)
                 # If we got a valid width, use this font
                 if width > 0:
                     best_font = fallback_font
@@ -697,34 +977,47 @@ class PDFFormatter:
 
         # Get the Unicode code point
         code_point = ord(char[0])
+        if code_point < 256:
+            return self._latin1_font_lut[code_point]
+
+        font = self._char_font_cache.get(char[0])
+        if font is None:
+            font = self._lookup_block_font(code_point)
+            self._char_font_cache[char[0]] = font
+        return font
+
+    def _lookup_block_font(self, code_point: int) -> str:
+        """
+        Find the font for a code point using the sorted Unicode block table.
+
+        Args:
+            code_point: The Unicode code point to look up
+
+        Returns:
+            The font name to use for this code point
+        """
+        i = bisect_right(_BLOCK_STARTS, code_point) - 1
+        if i >= 0 and code_point <= _BLOCK_ENDS[i]:
+            return self._block_fonts[i]
+        return self.font
+
+    def _resolve_block_font(self, block_name: str) -> str:
+        """
+        Determine the font to use for all characters of a Unicode block.
+
+        Args:
+            block_name: The name of the Unicode block
+
+        Returns:
+            The font name to use for characters in this block
+        """
+        # Use the block-to-font mapping if available
+        if block_name in BLOCK_TO_FONT_MAP:
+            return BLOCK_TO_FONT_MAP[block_name]
 
-        # Check which Unicode block this character belongs to
-        for block_name, (start, end) in UNICODE_BLOCKS.items():
-            if start <= code_point <= end:
-                # Use the block-to-font mapping if available
-                if block_name in BLOCK_TO_FONT_MAP:
-                    return BLOCK_TO_FONT_MAP[block_name]
-
-                # Special case for mathematical symbols not in our mapping
-                if (
-                    0x2100 <= code_point <= 0x2BFF
-                ):  # Range covering most mathematical symbols
-                    return "Symbol"
-
-                # Special case for Greek letters
-                if 0x0370 <= code_point <= 0x03FF:  # Greek and Coptic
-                    return "Symbol"
-
-                # Special case for Cyrillic
-                if block_name.startswith("Cyrillic"):
-                    # Try to find a font that supports Cyrillic
-                    for font in self.font_fallbacks:
-                        if font in [
-                            "Times-Roman",
-                            "Helvetica",
-                        ]:  # These might support some Cyrillic
-                            return font
-                    return self.font
+        # Special case for Cyrillic
+        if block_name.startswith("Cyrillic"):
+            return self._cyrillic_font
 
         # Default to the primary font
         return self.font
@@ -768,78 +1061,102 @@ class PDFFormatter:
             logger.debug(f"Primary font insertion failed, using fallbacks: {e}")
 
         # Split text into lines
-        lines = text.split("\n")
         x, y = pos
         line_height = fontsize * 1.2
 
-        for line_idx, line in enumerate(lines):
-            if not line:
-                y += line_height
-                continue
-
-            # Process the line character by character
-            current_font = self.font
-            current_text = ""
+        for line in text.split("\n"):
+            # Insert each run of same-font characters and advance past it
             current_x = x
+            for run_text, run_font in self._iter_font_runs(line):
+                current_x += self._insert_run(
+                    page, (current_x, y), run_text, run_font, fontsize, color
+                )
 
-            for char in line:
-                # Check if we need to switch fonts
-                char_font = self.get_font_for_character(char)
-
-                # If the font changes, output the accumulated text and reset
-                if char_font != current_font and current_text:
-                    try:
-                        page.insert_text(
-                            (current_x, y),
-                            current_text,
-                            fontname=current_font,
-                            fontsize=fontsize,
-                            color=color,
-                        )
-                        # Update x position
-                        current_x += fitz.get_text_length(
-                            current_text, fontname=current_font, fontsize=fontsize
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            f"Failed to insert text with font {current_font}: {e}"
-                        )
+            # Move to the next line
+            y += line_height
 
-                    # Reset for the new font
-                    current_text = ""
-                    current_font = char_font
-
-                # Add the character to the current text segment
-                current_text += char
-
-            # Output any remaining text
-            if current_text:
-                try:
-                    page.insert_text(
-                        (current_x, y),
-                        current_text,
-                        fontname=current_font,
-                        fontsize=fontsize,
-                        color=color,
-                    )
-                except Exception as e:
-                    logger.warning(
-                        f"Failed to insert text with font {current_font}: {e}"
-                    )
+    def _needs_fallback(self, text: str) -> bool:
+        """
+        Check whether any character of the text needs a fallback font.
 
-                    # Last resort: try each fallback font
-                    for fallback in self.font_fallbacks:
-                        try:
-                            page.insert_text(
-                                (current_x, y),
-                                current_text,
-                                fontname=fallback,
-                                fontsize=fontsize,
-                                color=color,
-                            )
-                            break
-                        except Exception:
-                            continue
+        Args:
+            text: The text to check
 
-            # Move to the next line
-            y += line_height
+        Returns:
+            True if the text contains characters outside the primary font
+        """
+        return (
+            self._fallback_run_re is not None
+            and self._fallback_run_re.search(text) is not None
+        )
+
+    def _iter_font_runs(self, line: str) -> Iterator[Tuple[str, str]]:
+        """
+        Split a line into maximal runs of characters that share a font.
+
+        Characters rendered with the primary font are matched as whole spans,
+        so only the (rare) fallback characters are classified individually.
+
+        Args:
+            line: The line of text to split
+
+        Yields:
+            Tuples of (run_text, font_name)
+        """
+        if self._fallback_run_re is None:
+            if line:
+                yield line, self.font
+            return
+
+        pos = 0
+        for match in self._fallback_run_re.finditer(line):
+            if match.start() > pos:
+                yield line[pos : match.start()], self.font
+            for font, chars in groupby(match.group(), key=self.get_font_for_character):
+                yield "".join(chars), font
+            pos = match.end()
+
+        if pos < len(line):
+            yield line[pos:], self.font
+
+    def _insert_run(
+        self,
+        page: fitz.Page,
+        pos: Tuple[float, float],
+        text: str,
+        font: str,
+        fontsize: int,
+        color: Tuple[float, float, float],
+    ) -> float:
+        """
+        Insert a run of text in a single font, trying fallbacks on failure.
+
+        Args:
+            page: The PDF page to write to
+            pos: The (x, y) position to insert the text
+            text: The text to insert
+            font: The font to use for the text
+            fontsize: The font size to use
+            color: The RGB color tuple to use
+
+        Returns:
+            The advance width of the inserted text, or 0.0 if it could not be
+            inserted with any font
+        """
+        try:
+            page.insert_text(pos, text, fontname=font, fontsize=fontsize, color=color)
+            return _measure(text, font, fontsize)
+        except Exception as e:
+            logger.warning(f"Failed to insert text with font {font}: {e}")
+
+        # Last resort: try each fallback font
+        for fallback in self.font_fallbacks:
+            try:
+                page.insert_text(
+                    pos, text, fontname=fallback, fontsize=fontsize, color=color
+                )
+                return _measure(text, fallback, fontsize)
+            except Exception:
+                continue
+
+        return 0.0
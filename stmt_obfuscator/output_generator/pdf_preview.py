@@ -4,18 +4,281 @@ PDF Preview module for the PDF Bank Statement Obfuscator.
 This module handles the generation of PDF previews for the UI.
 """
 
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import shutil
 import tempfile
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, Iterator, List, Literal, Optional, Tuple, Union
 
 import fitz  # PyMuPDF
-from PyQt6.QtGui import QImage, QPixmap
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QGuiApplication, QImage, QPixmap
 
+from stmt_obfuscator.config import PREVIEW_DISK_CACHE_MAX_BYTES
 from stmt_obfuscator.output_generator.pdf_formatter import PDFFormatter
 
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # Optional faster rasterizer
+    pdfium = None
+
 logger = logging.getLogger(__name__)
 
+# Rasterizers that can render previews
+PREVIEW_BACKENDS = ("mupdf", "pdfium")
+
+
+# Size in pixels of the thumbnail used to detect monochrome pages
+GRAYSCALE_PROBE_SIZE = 64
+
+# Resolution used for "fast" previews when no screen is available
+DEFAULT_SCREEN_DPI = 96
+
+# Version of the rendered page layout. Bump it when a change to the formatter
+# or the renderers changes how pages look, so stale disk cache entries are missed.
+PREVIEW_CACHE_VERSION = 1
+
+
+def _screen_dpi() -> int:
+    """
+    Get the logical resolution of the primary screen.
+
+    Returns:
+        The screen resolution in dots per inch, or DEFAULT_SCREEN_DPI if there
+        is no GUI application or screen
+    """
+    if QGuiApplication.instance() is None:
+        return DEFAULT_SCREEN_DPI
+    screen = QGuiApplication.primaryScreen()
+    if screen is None:
+        return DEFAULT_SCREEN_DPI
+    return round(screen.logicalDotsPerInch())
+
+
+def _preview_dpi(dpi: int, quality: str) -> int:
+    """
+    Get the resolution to render a preview at.
+
+    Args:
+        dpi: The requested resolution in dots per inch
+        quality: "high" renders at the requested DPI; "fast" renders at no
+            more than the screen DPI
+
+    Returns:
+        The resolution to render at in dots per inch
+
+    Raises:
+        ValueError: If the quality is unknown
+    """
+    if quality == "fast":
+        return min(dpi, _screen_dpi())
+    if quality != "high":
+        raise ValueError(f"Unknown preview quality: {quality}")
+    return dpi
+
+
+@lru_cache(maxsize=8)
+def _zoom_matrix(zoom_factor: float) -> fitz.Matrix:
+    """
+    Get the transformation matrix for rendering at a zoom factor.
+
+    Previews use a handful of resolutions, so the matrices are shared. Callers
+    must not modify the returned matrix.
+
+    Args:
+        zoom_factor: The scale factor relative to 72 DPI
+
+    Returns:
+        The scaling matrix
+    """
+    return fitz.Matrix(zoom_factor, zoom_factor)
+
+
+def _is_grayscale(page: fitz.Page) -> bool:
+    """
+    Check whether a page renders without color.
+
+    The check runs on a small RGB thumbnail, so it costs a fraction of the
+    full-resolution render.
+
+    Args:
+        page: The page to check
+
+    Returns:
+        True if every pixel of the thumbnail is a shade of gray
+    """
+    zoom_factor = GRAYSCALE_PROBE_SIZE / max(page.rect.width, page.rect.height, 1)
+    samples = page.get_pixmap(
+        matrix=fitz.Matrix(zoom_factor, zoom_factor), alpha=False
+    ).samples
+    red = samples[0::3]
+    return red == samples[1::3] and red == samples[2::3]
+
+
+def _render_page(
+    page: fitz.Page, matrix: fitz.Matrix, force_grayscale: bool = False
+) -> fitz.Pixmap:
+    """
+    Render a page without alpha, in grayscale if the page has no color.
+
+    Args:
+        page: The page to render
+        matrix: The transformation matrix for the render
+        force_grayscale: Whether to skip the color check and render in grayscale
+
+    Returns:
+        The rendered pixmap, with 1 (gray) or 3 (RGB) components per pixel
+    """
+    if force_grayscale or _is_grayscale(page):
+        return page.get_pixmap(matrix=matrix, colorspace=fitz.csGRAY, alpha=False)
+    return page.get_pixmap(matrix=matrix, alpha=False)
+
+
+def _samples_to_array(
+    width: int,
+    height: int,
+    stride: int,
+    components: int,
+    samples: Union[bytearray, memoryview],
+) -> np.ndarray:
+    """
+    View raw pixmap samples as an array without copying them.
+
+    Args:
+        width: The width of the image in pixels
+        height: The height of the image in pixels
+        stride: The number of bytes per row
+        components: The number of components per pixel (1 or 3)
+        samples: The pixel data
+
+    Returns:
+        A (height, width) array for grayscale samples, or a
+        (height, width, components) array otherwise
+    """
+    if components == 1:
+        return np.ndarray(
+            (height, width), dtype=np.uint8, buffer=samples, strides=(stride, 1)
+        )
+    return np.ndarray(
+        (height, width, components),
+        dtype=np.uint8,
+        buffer=samples,
+        strides=(stride, components, 1),
+    )
+
+
+def _pixmap_to_array(pixmap: fitz.Pixmap) -> np.ndarray:
+    """
+    View the samples of a PyMuPDF pixmap as a writable array.
+
+    Args:
+        pixmap: The pixmap to view
+
+    Returns:
+        The array sharing the pixmap's buffer, or viewing a copy of it if the
+        buffer is read-only
+    """
+    # pixmap.samples would materialize a bytes copy of the whole buffer
+    samples = pixmap.samples_mv
+    if samples.readonly:
+        # Some PyMuPDF versions expose the samples read-only, and
+        # _post_process may draw on the array in place
+        samples = bytearray(samples)
+    return _samples_to_array(
+        pixmap.width, pixmap.height, pixmap.stride, pixmap.n, samples
+    )
+
+
+def _array_to_qpixmap(buf: np.ndarray) -> QPixmap:
+    """
+    Convert a grayscale or RGB pixel array to a QPixmap.
+
+    QPixmap.fromImage copies the pixels, so the array only needs to stay alive
+    for the duration of the call.
+
+    Args:
+        buf: A (height, width) grayscale or (height, width, 3) RGB array
+
+    Returns:
+        The QPixmap holding the image
+    """
+    buf = np.ascontiguousarray(buf)
+    height, width = buf.shape[:2]
+    # fromImage converts to the native 32-bit format once, so painting the
+    # pixmap needs no conversion. Repacking to RGB32 here would cost more than
+    # Qt's own conversion, and the renderers cannot produce it directly.
+    if buf.ndim == 2:
+        image_format = QImage.Format.Format_Grayscale8
+    else:
+        image_format = QImage.Format.Format_RGB888
+    img = QImage(
+        sip.voidptr(buf.ctypes.data), width, height, buf.strides[0], image_format
+    )
+    return QPixmap.fromImage(img)
+
+
+def _array_to_png(buf: np.ndarray) -> bytes:
+    """
+    Encode a grayscale or RGB pixel array as PNG.
+
+    Args:
+        buf: A (height, width) grayscale or (height, width, 3) RGB array
+
+    Returns:
+        The PNG image
+    """
+    buf = np.ascontiguousarray(buf)
+    height, width = buf.shape[:2]
+    colorspace = fitz.csGRAY if buf.ndim == 2 else fitz.csRGB
+    return fitz.Pixmap(colorspace, width, height, buf.tobytes(), 0).tobytes("png")
+
+
+def _render_pages(
+    pdf_bytes: bytes,
+    page_numbers: List[int],
+    zoom_factor: float,
+    force_grayscale: bool = False,
+) -> List[Tuple[int, int, int, int, bytearray]]:
+    """
+    Render pages of a serialized PDF to raw samples.
+
+    This runs in worker processes, so it only returns plain data; Qt objects
+    are built from the samples in the parent process.
+
+    Args:
+        pdf_bytes: The PDF document serialized to bytes
+        page_numbers: The (0-based) numbers of the pages to render
+        zoom_factor: The scale factor relative to 72 DPI
+        force_grayscale: Whether to render every page in grayscale
+
+    Returns:
+        A list of (width, height, stride, components, samples) tuples, one per
+        page
+    """
+    matrix = _zoom_matrix(zoom_factor)
+    rendered = []
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+        for page_num in page_numbers:
+            pixmap = _render_page(pdf_doc[page_num], matrix, force_grayscale)
+            rendered.append(
+                (
+                    pixmap.width,
+                    pixmap.height,
+                    pixmap.stride,
+                    pixmap.n,
+                    bytearray(pixmap.samples_mv),
+                )
+            )
+    return rendered
+
 
 class PDFPreviewGenerator:
     """
@@ -25,67 +288,509 @@ class PDFPreviewGenerator:
     ensuring that what users see in the preview matches the final PDF output.
     """
     
-    def __init__(self, pdf_formatter: Optional[PDFFormatter] = None):
+    # Number of formatted documents to keep. The UI previews the original and
+    # the obfuscated document together, so both must fit.
+    FORMATTED_CACHE_SIZE = 4
+    
+    def __init__(
+        self,
+        pdf_formatter: Optional[PDFFormatter] = None,
+        cache_size: int = 32,
+        parallel_page_threshold: int = 8,
+        force_grayscale: bool = False,
+        backend: Literal["mupdf", "pdfium"] = "mupdf",
+        disk_cache_dir: Optional[Union[str, Path]] = None,
+        max_disk_cache_bytes: int = PREVIEW_DISK_CACHE_MAX_BYTES,
+    ):
         """
         Initialize the PDF preview generator.
         
         Args:
             pdf_formatter: The PDF formatter to use for generating PDFs.
                 If None, a new formatter will be created with default settings.
+            cache_size: The maximum number of rendered previews to keep in memory
+            parallel_page_threshold: The minimum number of pages for which pages
+                are rasterized in a pool of worker processes. Smaller documents
+                render faster than the workers start.
+            force_grayscale: Whether to render all pages in grayscale. Otherwise
+                each page is rendered in grayscale only if it has no color.
+            backend: The rasterizer to render previews with. "pdfium" requires
+                the optional pypdfium2 package and falls back to "mupdf" when it
+                is not installed. Formatting always uses PyMuPDF.
+            disk_cache_dir: The directory to keep rendered previews in across
+                sessions. If None, previews are only cached in memory. Cached
+                pages contain the document content, so only use a directory
+                the user controls.
+            max_disk_cache_bytes: The maximum total size of the disk cache
         """
+        if backend not in PREVIEW_BACKENDS:
+            raise ValueError(f"Unknown preview backend: {backend}")
+        if backend == "pdfium" and pdfium is None:
+            logger.warning(
+                "pypdfium2 is not installed, rendering previews with PyMuPDF"
+            )
+            backend = "mupdf"
+
         self.pdf_formatter = pdf_formatter or PDFFormatter()
+        self.cache_size = cache_size
+        self.parallel_page_threshold = parallel_page_threshold
+        self.force_grayscale = force_grayscale
+        self.backend = backend
+        self.disk_cache_dir = Path(disk_cache_dir) if disk_cache_dir else None
+        self.max_disk_cache_bytes = max_disk_cache_bytes
+
+        # Rendered previews keyed by (document hash, dpi, backend), in LRU order
+        self._pixmap_cache: OrderedDict[Tuple[str, int, str], List[QPixmap]] = (
+            OrderedDict()
+        )
+
+        # Formatted PDF bytes keyed by document hash, in LRU order
+        self._formatted_cache: OrderedDict[str, bytes] = OrderedDict()
+
         logger.info("Initialized PDFPreviewGenerator")
+
+    @staticmethod
+    def _document_key(document: Dict[str, Any]) -> str:
+        """
+        Compute a stable hash of a document's content.
+        
+        Args:
+            document: The document to hash
+            
+        Returns:
+            A hex digest identifying the document content
+        """
+        serialized = json.dumps(document, sort_keys=True, default=str)
+        return hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest()
     
-    def generate_preview(self, document: Dict[str, Any], dpi: int = 150) -> List[QPixmap]:
+    def _render_settings_key(self) -> str:
+        """
+        Compute a stable hash of the settings that affect how pages look.
+        
+        Returns:
+            A hex digest identifying the formatter settings and cache version
+        """
+        formatter = self.pdf_formatter
+        settings = {
+            "version": PREVIEW_CACHE_VERSION,
+            "font": formatter.font,
+            "font_size": formatter.font_size,
+            "margin": formatter.margin,
+            "include_timestamp": formatter.include_timestamp,
+            "include_metadata": formatter.include_metadata,
+            "font_fallbacks": formatter.font_fallbacks,
+            "preserve_layout": formatter.preserve_layout,
+            "layout_detail_level": formatter.layout_detail_level,
+        }
+        serialized = json.dumps(settings, sort_keys=True, default=str)
+        return hashlib.blake2b(serialized.encode("utf-8"), digest_size=8).hexdigest()
+    
+    def clear_cache(self) -> None:
+        """Discard all cached previews."""
+        self._pixmap_cache.clear()
+        self._formatted_cache.clear()
+    
+    def _get_formatted_bytes(
+        self, document: Dict[str, Any], document_key: Optional[str] = None
+    ) -> bytes:
+        """
+        Format a document as a PDF, reusing recent results for the same document.
+        
+        Args:
+            document: The document to format
+            document_key: The hash of the document, if already computed
+            
+        Returns:
+            The formatted PDF serialized to bytes
+        """
+        if document_key is None:
+            document_key = self._document_key(document)
+        cached = self._formatted_cache.get(document_key)
+        if cached is not None:
+            self._formatted_cache.move_to_end(document_key)
+            return cached
+        
+        # Format the document using the same formatter that would be used for export
+        pdf_doc = self.pdf_formatter.format_document(document, fitz.open())
+        pdf_bytes = self.pdf_formatter.to_bytes(pdf_doc)
+        pdf_doc.close()
+        
+        self._formatted_cache[document_key] = pdf_bytes
+        if len(self._formatted_cache) > self.FORMATTED_CACHE_SIZE:
+            self._formatted_cache.popitem(last=False)
+        return pdf_bytes
+    
+    def generate_preview(
+        self,
+        document: Dict[str, Any],
+        dpi: int = 150,
+        quality: Literal["fast", "high"] = "high",
+    ) -> List[QPixmap]:
         """
         Generate preview images of PDF pages.
         
         Args:
             document: The document to generate a preview for
             dpi: The resolution of the preview images in dots per inch
+            quality: "high" renders at the requested DPI; "fast" renders at no
+                more than the screen DPI, which is all a preview shown at 100%
+                can display
             
         Returns:
             A list of QPixmap objects, one for each page of the PDF
         """
         try:
-            # Create a temporary PDF document
-            pdf_doc = fitz.open()
+            return list(self.iter_preview(document, dpi, quality))
+        
+        except Exception as e:
+            logger.error(f"Error generating PDF preview: {e}")
+            import traceback
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            return []
+    
+    def iter_preview(
+        self,
+        document: Dict[str, Any],
+        dpi: int = 150,
+        quality: Literal["fast", "high"] = "high",
+    ) -> Iterator[QPixmap]:
+        """
+        Generate preview images of PDF pages one at a time.
+        
+        Each page is yielded as soon as it is rendered, so callers that stop
+        early never render the rest of the document. Rendering runs in the
+        caller's thread, so a GUI that must repaint between pages should use
+        PDFPreviewRenderer instead. The preview is cached only once every page
+        has been rendered.
+        
+        Args:
+            document: The document to generate a preview for
+            dpi: The resolution of the preview images in dots per inch
+            quality: The preview quality, as for generate_preview
+            
+        Yields:
+            A QPixmap for each page of the PDF, in order
+            
+        Raises:
+            Exception: If the document cannot be formatted or rendered
+        """
+        dpi = _preview_dpi(dpi, quality)
+        
+        # Reuse previously rendered pages for the same document and DPI
+        document_key = self._document_key(document)
+        cache_key = (document_key, dpi, self.backend)
+        cached = self._pixmap_cache.get(cache_key)
+        if cached is not None:
+            self._pixmap_cache.move_to_end(cache_key)
+            yield from list(cached)
+            return
+        
+        # Reuse pages rendered by an earlier session
+        cached = self._load_disk_cache(cache_key)
+        if cached is not None:
+            self._cache_pixmaps(cache_key, cached)
+            yield from list(cached)
+            return
+        
+        pdf_bytes = self._get_formatted_bytes(document, document_key)
+        
+        # Use a higher zoom factor for better quality
+        zoom_factor = dpi / 72  # 72 DPI is the default PDF resolution
+        
+        # Collect PNG encodings of the pages if they are cached on disk
+        png_pages = [] if self.disk_cache_dir is not None else None
+        
+        if self.backend == "pdfium":
+            pages = self._iter_pdfium(pdf_bytes, zoom_factor, png_pages)
+        else:
+            pages = self._iter_mupdf(pdf_bytes, zoom_factor, png_pages)
+        
+        pixmaps = []
+        for pixmap in pages:
+            pixmaps.append(pixmap)
+            yield pixmap
+        
+        if png_pages:
+            self._store_disk_cache(cache_key, png_pages)
+        self._cache_pixmaps(cache_key, pixmaps)
+    
+    def _iter_mupdf(
+        self,
+        pdf_bytes: bytes,
+        zoom_factor: float,
+        png_pages: Optional[List[bytes]] = None,
+    ) -> Iterator[QPixmap]:
+        """
+        Rasterize the pages of a document with PyMuPDF.
+        
+        Args:
+            pdf_bytes: The formatted PDF serialized to bytes
+            zoom_factor: The scale factor relative to 72 DPI
+            png_pages: If given, the PNG encoding of each page is appended to it
             
-            # Format the document using the same formatter that would be used for export
-            pdf_doc = self.pdf_formatter.format_document(document, pdf_doc)
+        Yields:
+            A QPixmap for each page of the PDF, in order
+        """
+        pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        try:
+            if len(pdf_doc) >= self.parallel_page_threshold:
+                # Rasterize large documents in worker processes
+                yield from self._render_parallel(
+                    pdf_bytes, len(pdf_doc), zoom_factor, png_pages
+                )
+                return
+            
+            matrix = _zoom_matrix(zoom_factor)
             
             # Convert each page to an image
-            pixmaps = []
-            for page_num in range(len(pdf_doc)):
-                page = pdf_doc[page_num]
-                
+            for page in pdf_doc.pages():
                 # Render the page to a pixmap
-                # Use a higher zoom factor for better quality
-                zoom_factor = dpi / 72  # 72 DPI is the default PDF resolution
-                matrix = fitz.Matrix(zoom_factor, zoom_factor)
-                pixmap = page.get_pixmap(matrix=matrix, alpha=False)
+                pixmap = _render_page(page, matrix, self.force_grayscale)
                 
                 # Convert the pixmap to a QPixmap
-                img = QImage(
-                    pixmap.samples,
-                    pixmap.width,
-                    pixmap.height,
-                    pixmap.stride,
-                    QImage.Format.Format_RGB888
-                )
-                qpixmap = QPixmap.fromImage(img)
-                pixmaps.append(qpixmap)
-            
+                buf = _pixmap_to_array(pixmap)
+                yield self._to_display(buf, page.number, png_pages)
+        finally:
             # Close the PDF document
             pdf_doc.close()
+    
+    def _post_process(self, buf: np.ndarray, page_num: int) -> np.ndarray:
+        """
+        Post-process a rendered page before it is converted for display.
+        
+        The default implementation returns the page unchanged. Subclasses can
+        override it to draw overlays, either modifying buf in place or
+        returning a new array.
+        
+        Args:
+            buf: The page pixels as a writable (height, width) grayscale or
+                (height, width, 3) RGB array
+            page_num: The (0-based) page number
+            
+        Returns:
+            The pixels to display
+        """
+        return buf
+    
+    def _to_display(
+        self,
+        buf: np.ndarray,
+        page_num: int,
+        png_pages: Optional[List[bytes]] = None,
+    ) -> QPixmap:
+        """
+        Post-process a rendered page and convert it to a QPixmap.
+        
+        Args:
+            buf: The page pixels
+            page_num: The (0-based) page number
+            png_pages: If given, the PNG encoding of the post-processed page is
+                appended to it
             
-            return pixmaps
+        Returns:
+            The QPixmap to display
+        """
+        buf = self._post_process(buf, page_num)
+        if png_pages is not None:
+            png_pages.append(_array_to_png(buf))
+        return _array_to_qpixmap(buf)
+    
+    def _disk_cache_path(self, cache_key: Tuple[str, int, str]) -> Optional[Path]:
+        """
+        Get the directory holding the pages of a preview in the disk cache.
         
+        Args:
+            cache_key: The (document hash, dpi, backend) key of the preview
+            
+        Returns:
+            The directory, or None if the disk cache is disabled
+        """
+        if self.disk_cache_dir is None:
+            return None
+        document_key, dpi, backend = cache_key
+        variant = f"{dpi}_{backend}_{self._render_settings_key()}"
+        if self.force_grayscale:
+            variant += "_gray"
+        return self.disk_cache_dir / document_key / variant
+    
+    def _load_disk_cache(self, cache_key: Tuple[str, int, str]) -> Optional[List[QPixmap]]:
+        """
+        Load the pages of a preview from the disk cache.
+        
+        Args:
+            cache_key: The (document hash, dpi, backend) key of the preview
+            
+        Returns:
+            A list of QPixmap objects, or None if the preview is not cached
+        """
+        preview_dir = self._disk_cache_path(cache_key)
+        if preview_dir is None or not preview_dir.is_dir():
+            return None
+        
+        try:
+            pixmaps = []
+            for page_path in sorted(preview_dir.glob("page_*.png")):
+                # The array views the pixmap's samples, so the pixmap must
+                # stay alive until Qt has copied them
+                pixmap = fitz.Pixmap(str(page_path))
+                pixmaps.append(_array_to_qpixmap(_pixmap_to_array(pixmap)))
+            # Mark the preview as recently used
+            os.utime(preview_dir)
         except Exception as e:
-            logger.error(f"Error generating PDF preview: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return []
+            logger.warning(f"Error reading cached preview {preview_dir}: {e}")
+            return None
+        
+        return pixmaps or None
+    
+    def _store_disk_cache(
+        self, cache_key: Tuple[str, int, str], png_pages: List[bytes]
+    ) -> None:
+        """
+        Store the pages of a preview in the disk cache.
+        
+        The pages are written to a temporary directory that is then renamed
+        into place, so readers never see a partially written preview.
+        
+        Args:
+            cache_key: The (document hash, dpi, backend) key of the preview
+            png_pages: The PNG encoding of each page
+        """
+        preview_dir = self._disk_cache_path(cache_key)
+        try:
+            preview_dir.parent.mkdir(parents=True, exist_ok=True)
+            temp_dir = Path(tempfile.mkdtemp(prefix=".tmp", dir=preview_dir.parent))
+            for page_num, png in enumerate(png_pages):
+                (temp_dir / f"page_{page_num:04d}.png").write_bytes(png)
+            
+            try:
+                os.replace(temp_dir, preview_dir)
+            except OSError:
+                # Another generator cached the same preview first
+                shutil.rmtree(temp_dir, ignore_errors=True)
+            
+            self._evict_disk_cache()
+        except Exception as e:
+            logger.warning(f"Error caching preview: {e}")
+    
+    def _evict_disk_cache(self) -> None:
+        """Delete the least recently used previews until the cache fits its limit."""
+        entries = []
+        total_size = 0
+        for preview_dir in self.disk_cache_dir.glob("*/*"):
+            # Skip previews that are still being written by _store_disk_cache
+            if not preview_dir.is_dir() or preview_dir.name.startswith(".tmp"):
+                continue
+            size = sum(path.stat().st_size for path in preview_dir.iterdir())
+            entries.append((preview_dir.stat().st_mtime, size, preview_dir))
+            total_size += size
+        
+        entries.sort(key=lambda entry: entry[0])
+        for _, size, preview_dir in entries:
+            if total_size <= self.max_disk_cache_bytes:
+                break
+            shutil.rmtree(preview_dir, ignore_errors=True)
+            total_size -= size
+            
+            # Remove the document directory once its last preview is gone
+            try:
+                preview_dir.parent.rmdir()
+            except OSError:
+                pass
+    
+    def _cache_pixmaps(
+        self, cache_key: Tuple[str, int, str], pixmaps: List[QPixmap]
+    ) -> None:
+        """
+        Cache rendered pages, evicting the least recently used entry.
+        
+        Args:
+            cache_key: The (document hash, dpi, backend) key of the preview
+            pixmaps: The rendered pages
+        """
+        self._pixmap_cache[cache_key] = pixmaps
+        if len(self._pixmap_cache) > self.cache_size:
+            self._pixmap_cache.popitem(last=False)
+    
+    def _iter_pdfium(
+        self,
+        pdf_bytes: bytes,
+        zoom_factor: float,
+        png_pages: Optional[List[bytes]] = None,
+    ) -> Iterator[QPixmap]:
+        """
+        Rasterize all pages of a document with PDFium.
+        
+        Pages are rendered in grayscale only if force_grayscale is set.
+        
+        Args:
+            pdf_bytes: The formatted PDF serialized to bytes
+            zoom_factor: The scale factor relative to 72 DPI
+            png_pages: If given, the PNG encoding of each page is appended to it
+            
+        Yields:
+            A QPixmap for each page of the PDF, in order
+        """
+        pdf_doc = pdfium.PdfDocument(pdf_bytes)
+        try:
+            for page_num in range(len(pdf_doc)):
+                bitmap = pdf_doc[page_num].render(
+                    scale=zoom_factor,
+                    grayscale=self.force_grayscale,
+                    rev_byteorder=True,
+                )
+                buf = bitmap.to_numpy()
+                if buf.ndim == 3 and buf.shape[2] == 1:
+                    buf = buf[:, :, 0]
+                yield self._to_display(buf, page_num, png_pages)
+        finally:
+            pdf_doc.close()
+    
+    def _render_parallel(
+        self,
+        pdf_bytes: bytes,
+        page_count: int,
+        zoom_factor: float,
+        png_pages: Optional[List[bytes]] = None,
+    ) -> List[QPixmap]:
+        """
+        Rasterize all pages of a document in a pool of worker processes.
+        
+        Each worker opens the serialized document and renders a contiguous
+        range of pages, following the PyMuPDF multiprocessing recipe.
+        
+        Args:
+            pdf_bytes: The formatted PDF serialized to bytes
+            page_count: The number of pages in the document
+            zoom_factor: The scale factor relative to 72 DPI
+            png_pages: If given, the PNG encoding of each page is appended to it
+            
+        Returns:
+            A list of QPixmap objects, one for each page of the PDF
+        """
+        processes = min(multiprocessing.cpu_count(), page_count)
+        segment_size = -(-page_count // processes)  # Ceiling division
+        segments = [
+            list(range(start, min(start + segment_size, page_count)))
+            for start in range(0, page_count, segment_size)
+        ]
+        
+        # Use spawn so workers do not inherit the GUI process state
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(processes=len(segments), maxtasksperchild=16) as pool:
+            results = pool.starmap(
+                _render_pages,
+                [
+                    (pdf_bytes, segment, zoom_factor, self.force_grayscale)
+                    for segment in segments
+                ],
+            )
+        
+        # Qt objects cannot cross processes, so build them here
+        pages = (page for segment in results for page in segment)
+        return [
+            self._to_display(_samples_to_array(*page), page_num, png_pages)
+            for page_num, page in enumerate(pages)
+        ]
     
     def generate_preview_file(self, document: Dict[str, Any]) -> Optional[Path]:
         """
@@ -98,24 +803,263 @@ class PDFPreviewGenerator:
             The path to the temporary PDF file, or None if generation failed
         """
         try:
-            # Create a temporary file
-            with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
-                temp_path = Path(temp_file.name)
-            
-            # Create a new PDF document
-            pdf_doc = fitz.open()
+            # Format first so no empty file is left behind if formatting fails
+            pdf_bytes = self._get_formatted_bytes(document)
             
-            # Format the document
-            pdf_doc = self.pdf_formatter.format_document(document, pdf_doc)
+            # Write the PDF through the descriptor of the new temporary file
+            fd, temp_name = tempfile.mkstemp(suffix=".pdf")
+            try:
+                view = memoryview(pdf_bytes)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
             
-            # Save the PDF to the temporary file
-            pdf_doc.save(temp_path)
-            pdf_doc.close()
-            
-            return temp_path
+            return Path(temp_name)
         
         except Exception as e:
             logger.error(f"Error generating PDF preview file: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
-            return None
\ No newline at end of file
+            return None
+
+
+class _PageRenderSignals(QObject):
+    """Signals emitted by a _PageRenderTask."""
+    
+    pageRendered = pyqtSignal(int, object)
+    finished = pyqtSignal()
+
+
+class _PageRenderTask(QRunnable):
+    """
+    Task that renders pages of a serialized PDF off the GUI thread.
+    
+    QPixmap objects can only be created on the GUI thread, so the task emits
+    raw samples and the receiver converts them.
+    """
+    
+    def __init__(
+        self,
+        pdf_bytes: bytes,
+        page_numbers: List[int],
+        zoom_factor: float,
+        force_grayscale: bool = False,
+    ):
+        """
+        Initialize the render task.
+        
+        Args:
+            pdf_bytes: The PDF document serialized to bytes
+            page_numbers: The (0-based) numbers of the pages to render, in order
+            zoom_factor: The scale factor relative to 72 DPI
+            force_grayscale: Whether to render every page in grayscale
+        """
+        super().__init__()
+        self.setAutoDelete(False)
+        self.signals = _PageRenderSignals()
+        self.pdf_bytes = pdf_bytes
+        self.page_numbers = page_numbers
+        self.zoom_factor = zoom_factor
+        self.force_grayscale = force_grayscale
+        self._cancelled = False
+    
+    def cancel(self) -> None:
+        """Stop rendering before the next page."""
+        self._cancelled = True
+    
+    def run(self) -> None:
+        """Render the pages, emitting pageRendered for each one."""
+        try:
+            matrix = _zoom_matrix(self.zoom_factor)
+            with fitz.open(stream=self.pdf_bytes, filetype="pdf") as pdf_doc:
+                for page_num in self.page_numbers:
+                    if self._cancelled:
+                        break
+                    pixmap = _render_page(
+                        pdf_doc[page_num], matrix, self.force_grayscale
+                    )
+                    self.signals.pageRendered.emit(
+                        page_num,
+                        (
+                            pixmap.width,
+                            pixmap.height,
+                            pixmap.stride,
+                            pixmap.n,
+                            bytearray(pixmap.samples_mv),
+                        ),
+                    )
+        except Exception as e:
+            logger.error(f"Error rendering preview pages: {e}")
+        finally:
+            self.signals.finished.emit()
+
+
+class PDFPreviewRenderer(QObject):
+    """
+    Incremental renderer for PDF previews.
+    
+    The first page is rendered immediately so the UI can show it, and the
+    remaining pages are rendered in a background thread and delivered one by
+    one through the pageReady signal.
+    """
+    
+    # Emitted with the page number and its QPixmap
+    pageReady = pyqtSignal(int, object)
+    finished = pyqtSignal()
+    
+    def __init__(
+        self,
+        preview_generator: Optional[PDFPreviewGenerator] = None,
+        parent: Optional[QObject] = None,
+    ):
+        """
+        Initialize the PDF preview renderer.
+        
+        Args:
+            preview_generator: The preview generator whose formatter and settings
+                are used. If None, a new generator will be created.
+            parent: The parent QObject
+        """
+        super().__init__(parent)
+        self.preview_generator = preview_generator or PDFPreviewGenerator()
+        
+        # PyMuPDF holds the GIL while rendering, so more threads would only contend
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+        self._task: Optional[_PageRenderTask] = None
+        
+        # Pages of the current preview, kept to cache it once it is complete
+        self._cache_key: Optional[Tuple[str, int, str]] = None
+        self._page_count = 0
+        self._pages: List[QPixmap] = []
+        self._png_pages: Optional[List[bytes]] = None
+    
+    def render(
+        self,
+        document: Dict[str, Any],
+        dpi: int = 150,
+        quality: Literal["fast", "high"] = "high",
+    ) -> int:
+        """
+        Start rendering a preview, cancelling any preview still in progress.
+        
+        pageReady is emitted for the first page before this returns, and for
+        the other pages as they are rendered. finished is emitted after the
+        last page. Previews in the generator's caches are delivered at once,
+        and completed previews are added to them.
+        
+        Args:
+            document: The document to generate a preview for
+            dpi: The resolution of the preview images in dots per inch
+            quality: The preview quality, as for PDFPreviewGenerator.generate_preview
+            
+        Returns:
+            The number of pages in the preview, or 0 if generation failed
+        """
+        self.cancel()
+        generator = self.preview_generator
+        
+        try:
+            dpi = _preview_dpi(dpi, quality)
+            zoom_factor = dpi / 72
+            force_grayscale = generator.force_grayscale
+            
+            # Reuse previously rendered pages for the same document and DPI.
+            # Pages are rasterized with PyMuPDF whatever the generator's
+            # backend, so they are cached under that backend.
+            cache_key = (generator._document_key(document), dpi, "mupdf")
+            cached = generator._pixmap_cache.get(cache_key)
+            if cached is not None:
+                generator._pixmap_cache.move_to_end(cache_key)
+            else:
+                cached = generator._load_disk_cache(cache_key)
+                if cached is not None:
+                    generator._cache_pixmaps(cache_key, cached)
+            
+            if cached is None:
+                pdf_bytes = generator._get_formatted_bytes(document, cache_key[0])
+                pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+                page_count = len(pdf_doc)
+                if page_count == 0:
+                    pdf_doc.close()
+                    self.finished.emit()
+                    return 0
+                
+                png_pages = [] if generator.disk_cache_dir is not None else None
+                matrix = _zoom_matrix(zoom_factor)
+                pixmap = _render_page(pdf_doc[0], matrix, force_grayscale)
+                first_page = generator._to_display(
+                    _pixmap_to_array(pixmap), 0, png_pages
+                )
+                pdf_doc.close()
+        
+        except Exception as e:
+            logger.error(f"Error generating PDF preview: {e}")
+            self.finished.emit()
+            return 0
+        
+        if cached is not None:
+            for page_num, pixmap in enumerate(list(cached)):
+                self.pageReady.emit(page_num, pixmap)
+            self.finished.emit()
+            return len(cached)
+        
+        self._cache_key = cache_key
+        self._page_count = page_count
+        self._pages = [first_page]
+        self._png_pages = png_pages
+        self.pageReady.emit(0, first_page)
+        
+        if page_count == 1:
+            self._cache_pages()
+            self.finished.emit()
+            return page_count
+        
+        task = _PageRenderTask(
+            pdf_bytes, list(range(1, page_count)), zoom_factor, force_grayscale
+        )
+        task.signals.pageRendered.connect(self._on_page_rendered)
+        task.signals.finished.connect(self._on_task_finished)
+        self._task = task
+        self._pool.start(task)
+        return page_count
+    
+    def _cache_pages(self) -> None:
+        """Add the current preview to the generator's caches if it is complete."""
+        if len(self._pages) != self._page_count:
+            return
+        generator = self.preview_generator
+        if self._png_pages:
+            generator._store_disk_cache(self._cache_key, self._png_pages)
+        generator._cache_pixmaps(self._cache_key, self._pages)
+    
+    def cancel(self) -> None:
+        """Stop rendering the current preview, if any."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._pages = []
+        self._png_pages = None
+    
+    def _is_current(self) -> bool:
+        """Check whether the sending task belongs to the current preview."""
+        return self._task is not None and self.sender() is self._task.signals
+    
+    def _on_page_rendered(
+        self, page_num: int, data: Tuple[int, int, int, int, bytearray]
+    ):
+        """Convert a rendered page to a QPixmap on the GUI thread."""
+        if self._is_current():
+            pixmap = self.preview_generator._to_display(
+                _samples_to_array(*data), page_num, self._png_pages
+            )
+            self._pages.append(pixmap)
+            self.pageReady.emit(page_num, pixmap)
+    
+    def _on_task_finished(self):
+        """Signal that the current preview is complete."""
+        if self._is_current():
+            self._task = None
+            self._cache_pages()
+            self.finished.emit()
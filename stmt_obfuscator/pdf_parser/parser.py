@@ -8,10 +8,15 @@ document objects with layout coordinates.
 """
 
 import logging
+import multiprocessing
+import os
+import re
+from bisect import bisect_right
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
-from unittest.mock import MagicMock
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import fitz  # PyMuPDF
 import numpy as np
@@ -24,8 +29,119 @@ from stmt_obfuscator.config import MAX_DOCUMENT_SIZE
 
 logger = logging.getLogger(__name__)
 
+# Minimum number of pages for which text is extracted in worker processes.
+# Extracting a page takes about 2ms while starting the workers takes about
+# half a second, so smaller documents are faster to extract in-process.
+PARALLEL_EXTRACTION_MIN_PAGES = 256
+
+# Flags for the "dict" text extraction. Image blocks are skipped during
+# extraction, so leave out their image data instead of copying it to Python.
+TEXT_EXTRACTION_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+# Marker separating pages in the full text used for PII detection
+PAGE_BREAK_MARKER = "\n\n--- PAGE BREAK ---\n\n"
+
+# Validation warning for documents without extractable text
+NO_TEXT_WARNING = "PDF may not contain extractable text"
+
+# A text span as (text, bbox, font, size, color, flags, line_number,
+# paragraph_id)
+SpanTuple = Tuple[
+    str, Tuple[float, float, float, float], str, float, int, int, int, int
+]
+
+# Number of recently parsed PDF files whose text spans are kept in memory, so
+# parsing the same statement again skips the text extraction
+EXTRACTION_CACHE_SIZE = 4
+
+# Text spans of recently parsed files, keyed by (path, mtime, size)
+_extraction_cache: Dict[Tuple[str, int, int], List[List[SpanTuple]]] = OrderedDict()
+
+# Common section headers in bank statements. When a header contains several
+# keywords, the first one listed wins.
+SECTION_KEYWORDS = {
+    "account summary": "account_summary",
+    "account information": "account_information",
+    "transaction": "transactions",
+    "balance": "balance_summary",
+    "statement period": "statement_period",
+    "customer information": "customer_information",
+    "electronic transaction": "electronic_transactions",
+    "deposit": "deposits",
+    "withdrawal": "withdrawals",
+    "fee": "fees",
+    "interest": "interest",
+}
+
+# Matches any section keyword in any case, so text without one is ruled out in
+# one scan without lowercasing it first
+_SECTION_KEYWORD_RE = re.compile(
+    "|".join(map(re.escape, SECTION_KEYWORDS)), re.IGNORECASE
+)
+
+
+def _page_spans(page: Any) -> List[SpanTuple]:
+    """
+    Extract the text spans of a page with their line and paragraph numbers.
+
+    Args:
+        page: The PDF page
+
+    Returns:
+        A list of span tuples in reading order
+    """
+    spans = []
+
+    # Track paragraph and line numbers
+    paragraph_id = 0
+    line_number = 0
+
+    for block in page.get_text("dict", flags=TEXT_EXTRACTION_FLAGS)["blocks"]:
+        if block["type"] == 0:  # Text block
+            paragraph_id += 1
+
+            for line in block["lines"]:
+                line_number += 1
+
+                spans.extend(
+                    (
+                        span["text"],
+                        span["bbox"],  # (x0, y0, x1, y1)
+                        span["font"],
+                        span["size"],
+                        span["color"],
+                        span.get("flags", 0),
+                        line_number,
+                        paragraph_id,
+                    )
+                    for span in line["spans"]
+                )
 
-@dataclass
+    return spans
+
+
+def _extract_page_spans(
+    pdf_path: str, page_numbers: List[int]
+) -> List[Tuple[int, List[SpanTuple]]]:
+    """
+    Extract the text spans of pages of a PDF file.
+
+    This runs in worker processes, so it opens its own copy of the document.
+
+    Args:
+        pdf_path: Path to the PDF file
+        page_numbers: The (0-based) numbers of the pages to extract
+
+    Returns:
+        A list of (page number, span tuples) pairs
+    """
+    with fitz.open(pdf_path) as document:
+        return [
+            (page_num, _page_spans(document[page_num])) for page_num in page_numbers
+        ]
+
+
+@dataclass(slots=True)
 class TextBlock:
     """A text block with positional metadata."""
 
@@ -38,13 +154,81 @@ class TextBlock:
     block_type: str = "text"  # text, header, footer, table_cell
     line_number: int = 0
     paragraph_id: int = 0
-    is_bold: bool = False
-    is_italic: bool = False
+    flags: int = 0  # PyMuPDF span flags
     confidence: float = 1.0
     section: str = ""  # e.g., "header", "account_summary", "transactions"
 
+    @property
+    def is_bold(self) -> bool:
+        """Whether the text is set in a bold font."""
+        return bool(self.flags & fitz.TEXT_FONT_BOLD)
+
+    @property
+    def is_italic(self) -> bool:
+        """Whether the text is set in an italic font."""
+        return bool(self.flags & fitz.TEXT_FONT_ITALIC)
+
 
 @dataclass
+class TextBlockArray:
+    """
+    The geometry and font attributes of text blocks as parallel arrays.
+
+    Row ``i`` of every array describes ``text_blocks[i]``, so layout code can
+    select and reduce blocks with NumPy instead of looping over TextBlock
+    objects.
+    """
+
+    bbox: np.ndarray  # (N, 4) float64 array of (x0, y0, x1, y1)
+    size: np.ndarray
+    color: np.ndarray
+    page: np.ndarray
+    line_number: np.ndarray
+    paragraph_id: np.ndarray
+    flags: np.ndarray
+
+    @classmethod
+    def from_blocks(cls, blocks: List[TextBlock]) -> "TextBlockArray":
+        """
+        Build the arrays from a list of text blocks.
+
+        Args:
+            blocks: The text blocks
+
+        Returns:
+            The text block arrays
+        """
+        bboxes = np.array([block.bbox for block in blocks], dtype=np.float64)
+        return cls(
+            bbox=bboxes.reshape(-1, 4),
+            size=np.array([block.size for block in blocks], dtype=np.float64),
+            color=np.array([block.color for block in blocks], dtype=np.int64),
+            page=np.array([block.page for block in blocks], dtype=np.int64),
+            line_number=np.array(
+                [block.line_number for block in blocks], dtype=np.int64
+            ),
+            paragraph_id=np.array(
+                [block.paragraph_id for block in blocks], dtype=np.int64
+            ),
+            flags=np.array([block.flags for block in blocks], dtype=np.int64),
+        )
+
+    def __len__(self) -> int:
+        """Return the number of text blocks."""
+        return len(self.size)
+
+    @property
+    def is_bold(self) -> np.ndarray:
+        """Mask of the blocks set in a bold font."""
+        return (self.flags & fitz.TEXT_FONT_BOLD) != 0
+
+    @property
+    def is_italic(self) -> np.ndarray:
+        """Mask of the blocks set in an italic font."""
+        return (self.flags & fitz.TEXT_FONT_ITALIC) != 0
+
+
+@dataclass(slots=True)
 class Table:
     """A table with positional metadata."""
 
@@ -71,16 +255,67 @@ class DocumentStructure:
     validation_results: Dict[str, Any] = field(default_factory=dict)
 
 
+@dataclass(slots=True)
+class _ChunkState:
+    """A chunk of a section being assembled for PII detection."""
+
+    section: str
+    text_parts: List[str] = field(default_factory=list)
+    length: int = 0
+    blocks: List[Dict[str, Any]] = field(default_factory=list)
+
+    def add(self, block: Dict[str, Any], block_text_len: int):
+        """
+        Add a text block, separated from the text so far by a space.
+
+        Args:
+            block: The text block
+            block_text_len: Length of the block's text
+        """
+        if self.length:
+            self.text_parts.append(" ")
+            self.length += 1
+
+        self.text_parts.append(block["text"])
+        self.length += block_text_len
+        self.blocks.append(block)
+
+    def to_chunk(self) -> Dict[str, Any]:
+        """
+        Build the chunk from the assembled blocks.
+
+        Returns:
+            The chunk, without any tables yet
+        """
+        return {
+            "text": "".join(self.text_parts),
+            "section": self.section,
+            "blocks": self.blocks,
+            "tables": [],
+        }
+
+
 class PDFParser:
     """PDF Parser for extracting text and structure from bank statements."""
 
     def __init__(self):
         """Initialize the PDF parser."""
         self.document = None
+        self.pdf_path: Optional[str] = None
         self.page_count = 0
+        self._page_dims: Optional[List[Tuple[float, float]]] = None
         self.text_blocks = []
+        self._block_array: Optional[TextBlockArray] = None
+        self._block_array_source: Optional[List[TextBlock]] = None
+        self._page_blocks: Dict[int, np.ndarray] = {}
+        self._page_bottoms: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._reading_order: Optional[np.ndarray] = None
+        # Density grid buffers reused across pages, grown as needed
+        self._count_scratch = np.zeros((64, 64), dtype=np.int64)
+        self._density_scratch = np.zeros((64, 64), dtype=np.float64)
         self.tables = []
         self.metadata = {}
+        self._metadata_cache: Optional[Dict[str, Any]] = None
         self.document_structure = DocumentStructure()
         self.validation_errors = []
 
@@ -94,22 +329,25 @@ class PDFParser:
         Returns:
             True if the PDF was loaded successfully, False otherwise
         """
-        path = Path(pdf_path)
-
-        if not path.exists():
+        try:
+            file_size = Path(pdf_path).stat().st_size
+        except OSError:
             logger.error(f"PDF file not found: {pdf_path}")
             return False
 
-        if path.stat().st_size > MAX_DOCUMENT_SIZE:
-            logger.error(f"PDF file too large: {path.stat().st_size} bytes")
+        if file_size > MAX_DOCUMENT_SIZE:
+            logger.error(f"PDF file too large: {file_size} bytes")
             return False
 
         try:
             self.document = fitz.open(pdf_path)
+            self.pdf_path = str(pdf_path)
             self.page_count = len(self.document)
+            self._metadata_cache = None
             self.metadata = self._extract_metadata()
 
             # Reset data structures
+            self._page_dims = None
             self.text_blocks = []
             self.tables = []
             self.validation_errors = []
@@ -140,21 +378,13 @@ class PDFParser:
         validation_results = {"valid": True, "errors": [], "warnings": [], "info": []}
 
         try:
-            # Special case for test environment
-            if isinstance(self.document, MagicMock):
-                # In test environment, always return valid=True
-                self.document_structure.validation_results = validation_results
-                self.validation_errors = []
-                logger.info("PDF validation completed in test environment: valid=True")
-                return validation_results
-
             # Check if PDF is encrypted
-            if hasattr(self.document, "is_encrypted") and self.document.is_encrypted:
+            if self.document.is_encrypted:
                 validation_results["valid"] = False
                 validation_results["errors"].append("PDF is encrypted")
 
-            # Check if PDF is damaged
-            if hasattr(self.document, "is_damaged") and self.document.is_damaged:
+            # Check if PDF is damaged (not every PyMuPDF version reports this)
+            if getattr(self.document, "is_damaged", False):
                 validation_results["valid"] = False
                 validation_results["errors"].append("PDF is damaged")
 
@@ -163,42 +393,20 @@ class PDFParser:
                 validation_results["valid"] = False
                 validation_results["errors"].append("PDF has no pages")
 
-            # Check for text extraction capability
-            has_text = False
-            try:
-                for page in self.document:
-                    if hasattr(page, "get_text"):
-                        text = page.get_text()
-                        if isinstance(text, str) and text.strip():
-                            has_text = True
-                            break
-                    elif isinstance(page, MagicMock):
-                        # In test environment, assume there is text
-                        has_text = True
-                        break
-            except (AttributeError, TypeError):
-                # Handle case where document might be a mock in tests
-                has_text = True  # Assume there is text in test environment
+            # Text extraction capability is checked by extract_text, which
+            # reads all of the text anyway
 
-            if not has_text:
-                validation_results["warnings"].append(
-                    "PDF may not contain extractable text"
-                )
-
-            # Check for form fields (not typical in bank statements)
-            form_fields = []
-            try:
+            # Check for form fields (not typical in bank statements). Only
+            # documents with an AcroForm have widgets, so skip the page walk
+            # for the others.
+            form_field_count = 0
+            if self.document.is_form_pdf:
                 for page in self.document:
-                    if hasattr(page, "widgets"):
-                        fields = page.widgets()
-                        form_fields.extend(fields)
-            except (AttributeError, TypeError):
-                # Handle case where document might be a mock in tests
-                pass
-
-            if form_fields:
+                    form_field_count += sum(1 for _ in page.widgets())
+
+            if form_field_count:
                 validation_results["info"].append(
-                    f"PDF contains {len(form_fields)} form fields"
+                    f"PDF contains {form_field_count} form fields"
                 )
 
             # Store validation results
@@ -212,14 +420,6 @@ class PDFParser:
 
         except Exception as e:
             logger.error(f"Error validating PDF: {e}")
-            # Special case for test environment
-            if "dict" in str(e) and "strip" in str(e):
-                # This is likely a test environment with MagicMock objects
-                validation_results["valid"] = True
-                self.document_structure.validation_results = validation_results
-                self.validation_errors = []
-                return validation_results
-
             validation_results["valid"] = False
             validation_results["errors"].append(f"Validation error: {str(e)}")
             self.validation_errors = validation_results["errors"]
@@ -237,46 +437,56 @@ class PDFParser:
             return []
 
         self.text_blocks = []
+        extend = self.text_blocks.extend
+        page_dims = self._page_dimensions()
 
-        for page_num, page in enumerate(self.document):
-            # Extract text blocks with detailed information
-            blocks = page.get_text("dict")["blocks"]
-
-            # Track paragraph and line numbers
-            paragraph_id = 0
-            line_number = 0
-
-            for block in blocks:
-                if block["type"] == 0:  # Text block
-                    paragraph_id += 1
-
-                    for line_idx, line in enumerate(block["lines"]):
-                        line_number += 1
-
-                        for span in line["spans"]:
-                            # Determine if text is bold or italic
-                            font_flags = span.get("flags", 0)
-                            is_bold = bool(font_flags & 2)  # Check if bold flag is set
-                            is_italic = bool(
-                                font_flags & 1
-                            )  # Check if italic flag is set
-
-                            # Create text block
-                            text_block = TextBlock(
-                                page=page_num + 1,
-                                text=span["text"],
-                                bbox=span["bbox"],  # (x0, y0, x1, y1)
-                                font=span["font"],
-                                size=span["size"],
-                                color=span["color"],
-                                block_type=self._determine_block_type(span, page_num),
-                                line_number=line_number,
-                                paragraph_id=paragraph_id,
-                                is_bold=is_bold,
-                                is_italic=is_italic,
-                            )
+        for page_num, spans in self._iter_page_spans():
+            page = page_num + 1
+
+            # Spans ending below this line are footers
+            footer_top = page_dims[page_num][1] - 50
+
+            # Headers are typically at the top of the page in a larger font,
+            # footers at the bottom of the page
+            extend(
+                TextBlock(
+                    page=page,
+                    text=text,
+                    bbox=bbox,
+                    font=font,
+                    size=size,
+                    color=color,
+                    block_type=(
+                        "header"
+                        if bbox[1] < 100 and size > 10
+                        else "footer" if bbox[3] > footer_top else "text"
+                    ),
+                    line_number=line_number,
+                    paragraph_id=paragraph_id,
+                    flags=font_flags,
+                )
+                for (
+                    text,
+                    bbox,
+                    font,
+                    size,
+                    color,
+                    font_flags,
+                    line_number,
+                    paragraph_id,
+                ) in spans
+            )
+
+        # Check for text extraction capability
+        if not any(block.text.strip() for block in self.text_blocks):
+            warnings = self.document_structure.validation_results.setdefault(
+                "warnings", []
+            )
+            if NO_TEXT_WARNING not in warnings:
+                warnings.append(NO_TEXT_WARNING)
 
-                            self.text_blocks.append(text_block)
+        # Build the array view used by the layout analysis
+        self._blocks_as_array()
 
         # Identify sections based on text properties
         self._identify_sections()
@@ -287,37 +497,167 @@ class PDFParser:
         logger.info(f"Extracted {len(self.text_blocks)} text blocks")
         return self.text_blocks
 
-    def _determine_block_type(self, span: Dict[str, Any], page_num: int) -> str:
+    def _blocks_as_array(self) -> TextBlockArray:
+        """
+        Get the text blocks as parallel arrays.
+
+        The arrays, and the index of the blocks on each page, are rebuilt
+        whenever the text block list is replaced or changes length.
+
+        Returns:
+            The text block arrays
         """
-        Determine the type of text block based on its properties.
+        if (
+            self._block_array is None
+            or self._block_array_source is not self.text_blocks
+            or len(self._block_array) != len(self.text_blocks)
+        ):
+            blocks = TextBlockArray.from_blocks(self.text_blocks)
+
+            # Group the block indices by page in one pass, keeping them in
+            # extraction order within each page
+            order = np.argsort(blocks.page, kind="stable")
+            pages, starts = np.unique(blocks.page[order], return_index=True)
+            self._page_blocks = dict(zip(pages.tolist(), np.split(order, starts[1:])))
+            self._page_bottoms = {}
+            self._reading_order = None
+
+            self._block_array = blocks
+            self._block_array_source = self.text_blocks
+        return self._block_array
+
+    def _page_block_indices(self, page: int) -> np.ndarray:
+        """
+        Get the indices of the text blocks on a page.
 
         Args:
-            span: The text span
-            page_num: The page number
+            page: The (1-based) page number
 
         Returns:
-            The block type (header, footer, table_cell, text)
+            The indices into text_blocks, in extraction order
         """
-        # Check if it's a header (typically at the top of the page and larger font)
-        if span["bbox"][1] < 100 and span["size"] > 10:
-            return "header"
+        self._blocks_as_array()
+        return self._page_blocks.get(page, np.empty(0, dtype=np.intp))
+
+    def _sorted_block_indices(self) -> np.ndarray:
+        """
+        Get the indices of the text blocks in reading order.
+
+        Blocks are ordered by page, then top edge, then left edge; ties keep
+        their extraction order.
+
+        Returns:
+            The indices into text_blocks, in reading order
+        """
+        blocks = self._blocks_as_array()
+        if self._reading_order is None:
+            self._reading_order = np.lexsort(
+                (blocks.bbox[:, 0], blocks.bbox[:, 1], blocks.page)
+            )
+        return self._reading_order
+
+    def _iter_page_spans(self):
+        """
+        Get the text spans of every page, in page order.
+
+        The spans of recently parsed files are reused while the file is
+        unchanged; otherwise they are extracted and remembered.
+
+        Yields:
+            (page number, span tuples) pairs
+        """
+        cache_key = self._extraction_cache_key()
+        if cache_key in _extraction_cache:
+            _extraction_cache.move_to_end(cache_key)
+            yield from enumerate(_extraction_cache[cache_key])
+            return
+
+        pages = []
+        for page_num, spans in self._extract_spans():
+            pages.append(spans)
+            yield page_num, spans
+
+        if cache_key is not None:
+            _extraction_cache[cache_key] = pages
+            while len(_extraction_cache) > EXTRACTION_CACHE_SIZE:
+                _extraction_cache.popitem(last=False)
+
+    def _extraction_cache_key(self) -> Optional[Tuple[str, int, int]]:
+        """
+        Get the key of the loaded file in the extraction cache.
+
+        Returns:
+            The (path, mtime, size) of the file, or None if the document was
+            not opened from a file or is password protected
+        """
+        if (
+            self.pdf_path is None
+            or not isinstance(self.document, fitz.Document)
+            or self.document.needs_pass
+        ):
+            return None
 
-        # Check if it's a footer (typically at the bottom of the page)
         try:
-            page = self.document[page_num]
-            # Handle MagicMock objects in tests
-            if hasattr(page.rect, "height") and not isinstance(
-                page.rect.height, MagicMock
-            ):
-                page_height = page.rect.height
-                if span["bbox"][3] > page_height - 50:
-                    return "footer"
-        except (IndexError, AttributeError, TypeError):
-            # If we can't determine if it's a footer, default to regular text
-            pass
-
-        # Default to regular text
-        return "text"
+            stat = os.stat(self.pdf_path)
+        except OSError:
+            return None
+        return (os.path.abspath(self.pdf_path), stat.st_mtime_ns, stat.st_size)
+
+    def _extract_spans(self):
+        """
+        Extract the text spans of every page, in page order.
+
+        Large documents opened from a file are split across worker processes;
+        other documents are extracted in this process.
+
+        Yields:
+            (page number, span tuples) pairs
+        """
+        if (
+            self.pdf_path is None
+            or not isinstance(self.document, fitz.Document)
+            or self.document.needs_pass
+            or self.page_count < PARALLEL_EXTRACTION_MIN_PAGES
+        ):
+            for page_num, page in enumerate(self.document):
+                yield page_num, _page_spans(page)
+            return
+
+        # Give each worker a contiguous range of pages
+        workers = min(os.cpu_count() or 1, self.page_count)
+        segment_size = -(-self.page_count // workers)  # Ceiling division
+        segments = [
+            list(range(start, min(start + segment_size, self.page_count)))
+            for start in range(0, self.page_count, segment_size)
+        ]
+
+        # Use spawn so workers do not inherit the GUI process state
+        with ProcessPoolExecutor(
+            max_workers=len(segments),
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            futures = [
+                executor.submit(_extract_page_spans, self.pdf_path, segment)
+                for segment in segments
+            ]
+            for future in futures:
+                yield from future.result()
+
+    def _page_dimensions(self) -> List[Tuple[float, float]]:
+        """
+        Get the width and height of every page.
+
+        The dimensions are read from the document once and reused by the
+        table detection and layout analysis.
+
+        Returns:
+            A list of (width, height) pairs in page order
+        """
+        if self._page_dims is None:
+            self._page_dims = [
+                (page.rect.width, page.rect.height) for page in self.document
+            ]
+        return self._page_dims
 
     def _identify_sections(self):
         """Identify document sections based on text properties."""
@@ -325,37 +665,31 @@ class PDFParser:
         current_section = "unknown"
         section_blocks = []
 
-        # Common section headers in bank statements
-        section_keywords = {
-            "account summary": "account_summary",
-            "account information": "account_information",
-            "transaction": "transactions",
-            "balance": "balance_summary",
-            "statement period": "statement_period",
-            "customer information": "customer_information",
-            "electronic transaction": "electronic_transactions",
-            "deposit": "deposits",
-            "withdrawal": "withdrawals",
-            "fee": "fees",
-            "interest": "interest",
-        }
-
         for i, block in enumerate(self.text_blocks):
             # Check if this block starts a new section
-            text_lower = block.text.lower()
+            section_name = None
+            if block.is_bold or block.size > 10:
+                # Check for section headers
+                if _SECTION_KEYWORD_RE.search(block.text):
+                    text_lower = block.text.lower()
+                    section_name = next(
+                        (
+                            name
+                            for keyword, name in SECTION_KEYWORDS.items()
+                            if keyword in text_lower
+                        ),
+                        None,
+                    )
 
-            # Check for section headers
-            for keyword, section_name in section_keywords.items():
-                if keyword in text_lower and (block.is_bold or block.size > 10):
-                    if section_blocks:
-                        sections[current_section] = section_blocks
+            if section_name is not None:
+                if section_blocks:
+                    sections[current_section] = section_blocks
 
-                    current_section = section_name
-                    section_blocks = [i]
+                current_section = section_name
+                section_blocks = [i]
 
-                    # Update the block's section
-                    block.section = current_section
-                    break
+                # Update the block's section
+                block.section = current_section
             else:
                 # Not a section header, add to current section
                 section_blocks.append(i)
@@ -381,14 +715,11 @@ class PDFParser:
 
         self.tables = []
 
-        for page_num, page in enumerate(self.document):
-            # Get page dimensions
-            page_width = page.rect.width
-            page_height = page.rect.height
+        for page_num, (page_width, page_height) in enumerate(self._page_dimensions()):
 
             # Extract text blocks for this page
             page_blocks = [
-                block for block in self.text_blocks if block.page == page_num + 1
+                self.text_blocks[i] for i in self._page_block_indices(page_num + 1)
             ]
 
             # Group blocks by vertical position (potential rows)
@@ -417,9 +748,8 @@ class PDFParser:
                         )
 
                         # Get bounding box for the cell
-                        cell_blocks = [page_blocks[idx] for idx in cell_block_indices]
                         cell_bbox = self._combine_bboxes(
-                            [block.bbox for block in cell_blocks]
+                            [page_blocks[idx].bbox for idx in cell_block_indices]
                         )
 
                         cells.append(
@@ -437,7 +767,7 @@ class PDFParser:
                     page=page_num + 1,
                     bbox=bbox,
                     rows=len(rows_data),
-                    cols=max([len(row) for row in rows_data]) if rows_data else 0,
+                    cols=max(map(len, rows_data), default=0),
                     cells=cells,
                     table_id=f"table_{page_num + 1}_{table_idx + 1}",
                     section=self._determine_table_section(bbox, page_num),
@@ -464,27 +794,30 @@ class PDFParser:
         if not blocks:
             return []
 
-        # Sort blocks by vertical position
-        sorted_blocks = sorted(
-            enumerate(blocks), key=lambda x: (x[1].bbox[1], x[1].bbox[0])
-        )
+        x0 = np.array([block.bbox[0] for block in blocks], dtype=np.float64)
+        y0 = np.array([block.bbox[1] for block in blocks], dtype=np.float64)
+
+        # Sort blocks by vertical position, then by horizontal position
+        order = np.lexsort((x0, y0))
+        y_sorted = y0[order]
 
+        # A row holds the blocks starting less than 5 units below its first
+        # block, which is a contiguous run of the sorted blocks
         rows = []
-        current_row = [sorted_blocks[0][0]]
-        current_y = sorted_blocks[0][1].bbox[1]
+        start = 0
+        while start < len(order):
+            row_y = y_sorted[start]
+            end = int(np.searchsorted(y_sorted, row_y + 5, side="left"))
 
-        for idx, block in sorted_blocks[1:]:
-            # If this block is on approximately the same line
-            if abs(block.bbox[1] - current_y) < 5:
-                current_row.append(idx)
-            else:
-                rows.append(current_row)
-                current_row = [idx]
-                current_y = block.bbox[1]
+            # Settle rounding at the boundary so the test matches the
+            # distance check exactly
+            while end < len(order) and y_sorted[end] - row_y < 5:
+                end += 1
+            while end > start + 1 and not y_sorted[end - 1] - row_y < 5:
+                end -= 1
 
-        # Add the last row
-        if current_row:
-            rows.append(current_row)
+            rows.append(order[start:end].tolist())
+            start = end
 
         return rows
 
@@ -509,6 +842,10 @@ class PDFParser:
         current_table_rows = []
         table_start_row = 0
 
+        # Sort the x-coordinates of each row once for the alignment checks
+        x0 = self._blocks_as_array().bbox[:, 0]
+        sorted_x = [np.sort(x0[row]) for row in rows]
+
         for i, row in enumerate(rows):
             if i == 0:
                 current_table_rows.append(row)
@@ -518,7 +855,7 @@ class PDFParser:
             prev_row = rows[i - 1]
 
             # If rows have similar number of elements and alignment
-            if self._rows_have_similar_alignment(prev_row, row):
+            if self._rows_have_similar_alignment(prev_row, row, sorted_x[i]):
                 current_table_rows.append(row)
             else:
                 # If we have enough rows for a table
@@ -527,14 +864,7 @@ class PDFParser:
                     table_data = self._process_table_rows(current_table_rows)
 
                     # Calculate table bounding box
-                    all_blocks = [
-                        self.text_blocks[idx]
-                        for row in current_table_rows
-                        for idx in row
-                    ]
-                    table_bbox = self._combine_bboxes(
-                        [block.bbox for block in all_blocks]
-                    )
+                    table_bbox = self._table_bbox(current_table_rows)
 
                     potential_tables.append(
                         {
@@ -552,10 +882,7 @@ class PDFParser:
         # Check if the last set of rows forms a table
         if len(current_table_rows) >= 3:
             table_data = self._process_table_rows(current_table_rows)
-            all_blocks = [
-                self.text_blocks[idx] for row in current_table_rows for idx in row
-            ]
-            table_bbox = self._combine_bboxes([block.bbox for block in all_blocks])
+            table_bbox = self._table_bbox(current_table_rows)
 
             potential_tables.append(
                 {
@@ -568,13 +895,20 @@ class PDFParser:
 
         return potential_tables
 
-    def _rows_have_similar_alignment(self, row1: List[int], row2: List[int]) -> bool:
+    def _rows_have_similar_alignment(
+        self,
+        row1: List[int],
+        row2: List[int],
+        sorted_x2: Optional[np.ndarray] = None,
+    ) -> bool:
         """
         Check if two rows have similar column alignment.
 
         Args:
             row1: First row (list of block indices)
             row2: Second row (list of block indices)
+            sorted_x2: The sorted x-coordinates of the blocks in row2, if
+                already known
 
         Returns:
             True if rows have similar alignment, False otherwise
@@ -583,22 +917,26 @@ class PDFParser:
         if abs(len(row1) - len(row2)) > 2:
             return False
 
-        # Get x-coordinates for blocks in each row
-        x_coords1 = [self.text_blocks[idx].bbox[0] for idx in row1]
-        x_coords2 = [self.text_blocks[idx].bbox[0] for idx in row2]
-
         # If either row is empty, they can't be aligned
-        if not x_coords1 or not x_coords2:
+        if not row1 or not row2:
             return False
 
+        # Get x-coordinates for blocks in each row
+        x0 = self._blocks_as_array().bbox[:, 0]
+        x_coords1 = x0[row1]
+        if sorted_x2 is None:
+            sorted_x2 = np.sort(x0[row2])
+
         # Check if x-coordinates are roughly aligned
         alignment_threshold = 20  # pixels
 
-        # For each x-coordinate in row1, check if there's a similar one in row2
-        matches = 0
-        for x1 in x_coords1:
-            if any(abs(x1 - x2) < alignment_threshold for x2 in x_coords2):
-                matches += 1
+        # For each x-coordinate in row1, the closest one in row2 is one of the
+        # neighbours of its insertion point
+        positions = np.searchsorted(sorted_x2, x_coords1)
+        left = sorted_x2[np.maximum(positions - 1, 0)]
+        right = sorted_x2[np.minimum(positions, len(sorted_x2) - 1)]
+        distances = np.minimum(np.abs(x_coords1 - left), np.abs(x_coords1 - right))
+        matches = np.count_nonzero(distances < alignment_threshold)
 
         # Calculate match percentage
         match_percentage = matches / len(x_coords1)
@@ -655,61 +993,85 @@ class PDFParser:
             List of x-coordinates representing column boundaries
         """
         # Collect all x-coordinates
-        x_starts = []
-        for row in table_rows:
-            for block_idx in row:
-                block = self.text_blocks[block_idx]
-                x_starts.append(block.bbox[0])
+        block_indices = [block_idx for row in table_rows for block_idx in row]
 
         # Use clustering to identify column boundaries
-        if not x_starts:
+        if not block_indices:
             return [0, 100]  # Default if no data
 
         # Sort x-coordinates
-        x_starts.sort()
+        x_starts = np.sort(self._blocks_as_array().bbox[block_indices, 0])
 
-        # Find clusters
-        clusters = []
-        current_cluster = [x_starts[0]]
-
-        for x in x_starts[1:]:
-            if x - current_cluster[-1] < 20:  # Threshold for same column
-                current_cluster.append(x)
-            else:
-                clusters.append(sum(current_cluster) / len(current_cluster))
-                current_cluster = [x]
-
-        # Add the last cluster
-        if current_cluster:
-            clusters.append(sum(current_cluster) / len(current_cluster))
+        # Start a new cluster wherever the gap to the previous x-coordinate
+        # reaches the threshold for the same column
+        cluster_starts = np.flatnonzero(np.diff(x_starts) >= 20) + 1
+        cluster_starts = np.concatenate(([0], cluster_starts))
+        cluster_sizes = np.diff(np.append(cluster_starts, len(x_starts)))
+        clusters = np.add.reduceat(x_starts, cluster_starts) / cluster_sizes
 
         # Add start and end boundaries
-        boundaries = [0] + clusters + [max(x_starts) + 100]
+        boundaries = [0] + clusters.tolist() + [float(x_starts[-1]) + 100]
 
         return boundaries
 
     def _combine_bboxes(
-        self, bboxes: List[Tuple[float, float, float, float]]
+        self, bboxes: Union[List[Tuple[float, float, float, float]], np.ndarray]
     ) -> Tuple[float, float, float, float]:
         """
         Combine multiple bounding boxes into one.
 
         Args:
-            bboxes: List of bounding boxes (x0, y0, x1, y1)
+            bboxes: List or (N, 4) array of bounding boxes (x0, y0, x1, y1)
 
         Returns:
             Combined bounding box
         """
-        if not bboxes:
+        if len(bboxes) == 0:
             return (0, 0, 0, 0)
 
-        x0 = min(bbox[0] for bbox in bboxes)
-        y0 = min(bbox[1] for bbox in bboxes)
-        x1 = max(bbox[2] for bbox in bboxes)
-        y1 = max(bbox[3] for bbox in bboxes)
+        # Setting up NumPy costs more than it saves for a few boxes
+        if len(bboxes) < 4 and not isinstance(bboxes, np.ndarray):
+            x0 = min(bbox[0] for bbox in bboxes)
+            y0 = min(bbox[1] for bbox in bboxes)
+            x1 = max(bbox[2] for bbox in bboxes)
+            y1 = max(bbox[3] for bbox in bboxes)
+            return (x0, y0, x1, y1)
+
+        bbox_array = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+        x0, y0 = bbox_array[:, :2].min(axis=0).tolist()
+        x1, y1 = bbox_array[:, 2:].max(axis=0).tolist()
 
         return (x0, y0, x1, y1)
 
+    def _bbox_array(self, blocks: Union[List[TextBlock], np.ndarray]) -> np.ndarray:
+        """
+        Get the bounding boxes of text blocks as an array.
+
+        Args:
+            blocks: List of text blocks, or their (N, 4) array of bounding boxes
+
+        Returns:
+            (N, 4) array of bounding boxes (x0, y0, x1, y1)
+        """
+        if not isinstance(blocks, np.ndarray):
+            blocks = np.array([block.bbox for block in blocks], dtype=np.float64)
+        return blocks.reshape(-1, 4)
+
+    def _table_bbox(
+        self, table_rows: List[List[int]]
+    ) -> Tuple[float, float, float, float]:
+        """
+        Get the bounding box of the text blocks in a table.
+
+        Args:
+            table_rows: List of rows, where each row is a list of block indices
+
+        Returns:
+            Combined bounding box
+        """
+        block_indices = [block_idx for row in table_rows for block_idx in row]
+        return self._combine_bboxes(self._blocks_as_array().bbox[block_indices])
+
     def _determine_table_section(
         self, table_bbox: Tuple[float, float, float, float], page_num: int
     ) -> str:
@@ -726,26 +1088,43 @@ class PDFParser:
         # Find text blocks above the table that might indicate its section
         table_y_top = table_bbox[1]
 
-        # Look for section headers above the table
-        potential_headers = [
-            block
-            for block in self.text_blocks
-            if block.page == page_num + 1
-            and block.bbox[3] < table_y_top
-            and block.bbox[3] > table_y_top - 50
-        ]
+        # Look for section headers ending less than 50 units above the table
+        bottoms, block_indices = self._page_block_bottoms(page_num + 1)
+        start = np.searchsorted(bottoms, table_y_top - 50, side="right")
+        end = np.searchsorted(bottoms, table_y_top, side="left")
 
-        if potential_headers:
-            # Sort by vertical position (closest to table first)
-            potential_headers.sort(key=lambda b: table_y_top - b.bbox[3])
+        if start < end:
+            # The closest header ends lowest; on a tie, take the first one on
+            # the page
+            distances = table_y_top - bottoms[start:end]
+            closest = start + np.flatnonzero(distances == distances[-1])[0]
+            header = self.text_blocks[block_indices[closest:end].min()]
 
             # Use the section of the closest header
-            if potential_headers[0].section:
-                return potential_headers[0].section
+            if header.section:
+                return header.section
 
         # Default to transactions if we can't determine
         return "transactions"
 
+    def _page_block_bottoms(self, page: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the bottom edges of the text blocks on a page in ascending order.
+
+        Args:
+            page: The (1-based) page number
+
+        Returns:
+            The sorted bottom edges and the text block indices in the same
+            order, with blocks sharing a bottom edge kept in page order
+        """
+        if page not in self._page_bottoms:
+            block_indices = self._page_block_indices(page)
+            bottoms = self._blocks_as_array().bbox[block_indices, 3]
+            order = np.argsort(bottoms, kind="stable")
+            self._page_bottoms[page] = (bottoms[order], block_indices[order])
+        return self._page_bottoms[page]
+
     def get_document_structure(self) -> DocumentStructure:
         """
         Get the document structure with text blocks, tables, and layout information.
@@ -784,24 +1163,27 @@ class PDFParser:
             "potential_footers": [],
         }
 
-        for page_num, page in enumerate(self.document):
+        blocks = self._blocks_as_array()
+
+        for page_num, (page_width, page_height) in enumerate(self._page_dimensions()):
             # Page dimensions
-            page_width = page.rect.width
-            page_height = page.rect.height
             layout_analysis["page_dimensions"].append((page_width, page_height))
 
             # Identify margins
-            page_blocks = [
-                block for block in self.text_blocks if block.page == page_num + 1
-            ]
+            page_indices = self._page_block_indices(page_num + 1)
 
-            if page_blocks:
-                left_margin = min(block.bbox[0] for block in page_blocks)
-                right_margin = page_width - max(block.bbox[2] for block in page_blocks)
-                top_margin = min(block.bbox[1] for block in page_blocks)
-                bottom_margin = page_height - max(
-                    block.bbox[3] for block in page_blocks
-                )
+            if len(page_indices):
+                page_bboxes = blocks.bbox[page_indices]
+                y0, y1 = page_bboxes[:, 1], page_bboxes[:, 3]
+
+                # Reduce the top-left and bottom-right corners in one pass each
+                min_x0, min_y0 = page_bboxes[:, :2].min(axis=0).tolist()
+                max_x1, max_y1 = page_bboxes[:, 2:].max(axis=0).tolist()
+
+                left_margin = min_x0
+                right_margin = page_width - max_x1
+                top_margin = min_y0
+                bottom_margin = page_height - max_y1
 
                 layout_analysis["margins"].append(
                     {
@@ -813,18 +1195,13 @@ class PDFParser:
                 )
 
                 # Identify potential headers and footers
-                headers = [
-                    block
-                    for block in page_blocks
-                    if block.bbox[1] < top_margin + 50
-                    and (block.is_bold or block.size > 10)
-                ]
-
-                footers = [
-                    block
-                    for block in page_blocks
-                    if block.bbox[3] > page_height - bottom_margin - 50
-                ]
+                is_bold = (blocks.flags[page_indices] & fitz.TEXT_FONT_BOLD) != 0
+                is_header = (y0 < top_margin + 50) & (
+                    is_bold | (blocks.size[page_indices] > 10)
+                )
+                is_footer = y1 > page_height - bottom_margin - 50
+                headers = [self.text_blocks[i] for i in page_indices[is_header]]
+                footers = [self.text_blocks[i] for i in page_indices[is_footer]]
 
                 layout_analysis["potential_headers"].append(
                     [{"text": block.text, "bbox": block.bbox} for block in headers]
@@ -836,24 +1213,28 @@ class PDFParser:
 
                 # Analyze text density
                 density_map = self._calculate_text_density(
-                    page_blocks, page_width, page_height
+                    page_bboxes, page_width, page_height
                 )
                 layout_analysis["text_density"].append(density_map)
 
                 # Identify columns
-                columns = self._identify_columns(page_blocks, page_width)
+                columns = self._identify_columns(page_bboxes, page_width)
                 layout_analysis["columns"].append(columns)
 
         return layout_analysis
 
     def _calculate_text_density(
-        self, blocks: List[TextBlock], page_width: float, page_height: float
+        self,
+        blocks: Union[List[TextBlock], np.ndarray],
+        page_width: float,
+        page_height: float,
     ) -> Dict[str, Any]:
         """
         Calculate text density across the page.
 
         Args:
-            blocks: List of text blocks on the page
+            blocks: List of text blocks on the page, or their (N, 4) array of
+                bounding boxes
             page_width: Width of the page
             page_height: Height of the page
 
@@ -865,56 +1246,72 @@ class PDFParser:
         grid_width = int(page_width / grid_size) + 1
         grid_height = int(page_height / grid_size) + 1
 
-        density_grid = np.zeros((grid_height, grid_width))
-
-        # Fill the grid with text density
-        for block in blocks:
-            x0, y0, x1, y1 = block.bbox
-
-            # Convert to grid coordinates
-            grid_x0 = max(0, int(x0 / grid_size))
-            grid_y0 = max(0, int(y0 / grid_size))
-            grid_x1 = min(grid_width - 1, int(x1 / grid_size))
-            grid_y1 = min(grid_height - 1, int(y1 / grid_size))
-
-            # Fill the grid cells covered by this block
-            for y in range(grid_y0, grid_y1 + 1):
-                for x in range(grid_x0, grid_x1 + 1):
-                    density_grid[y, x] += 1
+        # Convert the blocks to grid coordinates
+        grid_coords = (self._bbox_array(blocks) / grid_size).astype(np.int64)
+        grid_x0 = np.maximum(grid_coords[:, 0], 0)
+        grid_y0 = np.maximum(grid_coords[:, 1], 0)
+        grid_x1 = np.minimum(grid_coords[:, 2], grid_width - 1)
+        grid_y1 = np.minimum(grid_coords[:, 3], grid_height - 1)
+
+        # Skip blocks that cover no grid cells
+        covers = (grid_x0 <= grid_x1) & (grid_y0 <= grid_y1)
+        grid_x0, grid_y0 = grid_x0[covers], grid_y0[covers]
+        grid_x1, grid_y1 = grid_x1[covers], grid_y1[covers]
+
+        # Fill the grid with text density: mark the corners of each block's
+        # cells in a difference grid, then a 2D prefix sum counts the blocks
+        # covering every cell
+        delta, density_grid = self._density_buffers(grid_height, grid_width)
+        np.add.at(delta, (grid_y0, grid_x0), 1)
+        np.add.at(delta, (grid_y0, grid_x1 + 1), -1)
+        np.add.at(delta, (grid_y1 + 1, grid_x0), -1)
+        np.add.at(delta, (grid_y1 + 1, grid_x1 + 1), 1)
+        np.cumsum(delta, axis=0, out=delta)
+        np.cumsum(delta, axis=1, out=delta)
+        counts = delta[:grid_height, :grid_width]
 
         # Normalize the density
-        max_density = np.max(density_grid) if np.max(density_grid) > 0 else 1
-        density_grid = density_grid / max_density
+        np.divide(counts, max(int(counts.max()), 1), out=density_grid)
 
         # Find high-density regions (potential tables or text blocks)
+        labels, region_count = self._label_regions(density_grid, 0.5)
+
+        # Measure every region at once from its label
+        flat_labels = labels.ravel()
+        region_sizes = np.bincount(flat_labels, minlength=region_count + 1)
+        region_densities = np.bincount(
+            flat_labels, weights=density_grid.ravel(), minlength=region_count + 1
+        )
+        rows, cols = np.indices(labels.shape)
+        region_x0 = np.full(region_count + 1, grid_width)
+        region_y0 = np.full(region_count + 1, grid_height)
+        region_x1 = np.zeros(region_count + 1, dtype=np.int64)
+        region_y1 = np.zeros(region_count + 1, dtype=np.int64)
+        np.minimum.at(region_x0, flat_labels, cols.ravel())
+        np.minimum.at(region_y0, flat_labels, rows.ravel())
+        np.maximum.at(region_x1, flat_labels, cols.ravel() + 1)
+        np.maximum.at(region_y1, flat_labels, rows.ravel() + 1)
+
         high_density_regions = []
-        visited = np.zeros_like(density_grid, dtype=bool)
-
-        for y in range(grid_height):
-            for x in range(grid_width):
-                if density_grid[y, x] > 0.5 and not visited[y, x]:
-                    # Flood fill to find connected region
-                    region = self._flood_fill(density_grid, visited, x, y, 0.5)
-
-                    if len(region) > 4:  # Minimum size for a region
-                        # Convert back to page coordinates
-                        region_bbox = (
-                            min(x for x, y in region) * grid_size,
-                            min(y for x, y in region) * grid_size,
-                            (max(x for x, y in region) + 1) * grid_size,
-                            (max(y for x, y in region) + 1) * grid_size,
-                        )
+        for label in range(1, region_count + 1):
+            region_size = int(region_sizes[label])
+
+            if region_size > 4:  # Minimum size for a region
+                # Convert back to page coordinates
+                region_bbox = (
+                    int(region_x0[label]) * grid_size,
+                    int(region_y0[label]) * grid_size,
+                    int(region_x1[label]) * grid_size,
+                    int(region_y1[label]) * grid_size,
+                )
 
-                        high_density_regions.append(
-                            {
-                                "bbox": region_bbox,
-                                "size": len(region),
-                                "avg_density": sum(
-                                    density_grid[y, x] for x, y in region
-                                )
-                                / len(region),
-                            }
-                        )
+                high_density_regions.append(
+                    {
+                        "bbox": region_bbox,
+                        "size": region_size,
+                        "avg_density": float(region_densities[label]) / region_size,
+                    }
+                )
 
         return {
             "grid_size": grid_size,
@@ -922,163 +1319,240 @@ class PDFParser:
             "high_density_regions": high_density_regions,
         }
 
-    def _flood_fill(
-        self, grid: np.ndarray, visited: np.ndarray, x: int, y: int, threshold: float
-    ) -> List[Tuple[int, int]]:
+    def _density_buffers(
+        self, grid_height: int, grid_width: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Perform flood fill to find connected regions in the density grid.
+        Get the buffers for a page's density grid.
+
+        The buffers are shared by all pages and only reallocated when a page
+        needs a larger grid than the ones before it.
+
+        Args:
+            grid_height: Number of grid rows
+            grid_width: Number of grid columns
+
+        Returns:
+            A zeroed (grid_height + 1, grid_width + 1) integer difference grid
+            and a (grid_height, grid_width) float density grid
+        """
+        height, width = self._count_scratch.shape
+        if height < grid_height + 1 or width < grid_width + 1:
+            shape = (max(height, grid_height + 1), max(width, grid_width + 1))
+            self._count_scratch = np.zeros(shape, dtype=np.int64)
+            self._density_scratch = np.zeros(shape, dtype=np.float64)
+
+        delta = self._count_scratch[: grid_height + 1, : grid_width + 1]
+        delta.fill(0)
+        return delta, self._density_scratch[:grid_height, :grid_width]
+
+    def _label_regions(
+        self, grid: np.ndarray, threshold: float
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Label the connected regions of cells above a threshold.
+
+        The cells above the threshold are split into horizontal runs with
+        array operations, so the flood fill only has to visit each run once
+        rather than each cell.
 
         Args:
             grid: Density grid
-            visited: Grid of visited cells
-            x, y: Starting coordinates
             threshold: Density threshold
 
         Returns:
-            List of coordinates in the connected region
+            A grid of region labels, where 0 marks cells outside any region
+            and regions are numbered from 1 in the order their first cell
+            appears row by row, and the number of regions
         """
-        if (
-            x < 0
-            or y < 0
-            or x >= grid.shape[1]
-            or y >= grid.shape[0]
-            or visited[y, x]
-            or grid[y, x] <= threshold
-        ):
-            return []
+        mask = grid > threshold
+        height, width = mask.shape
+
+        # Find where each run of cells above the threshold starts and stops,
+        # numbering the runs from 1 row by row
+        edges = np.diff(mask.astype(np.int8), axis=1, prepend=0, append=0)
+        run_rows, run_starts = np.nonzero(edges == 1)
+        run_stops = np.nonzero(edges == -1)[1]
+        run_ids = np.cumsum(edges[:, :width] == 1).reshape(height, width) * mask
+        row_offsets = np.searchsorted(run_rows, np.arange(height + 1))
+
+        runs = (run_rows.tolist(), run_starts.tolist(), run_stops.tolist())
+        row_offsets = row_offsets.tolist()
+        visited = [False] * len(run_rows)
+
+        # Region label of each run, with run 0 standing for no run
+        run_labels = np.zeros(len(run_rows) + 1, dtype=np.int64)
+        region_count = 0
+
+        for run in range(len(run_rows)):
+            if visited[run]:
+                continue
 
-        visited[y, x] = True
-        region = [(x, y)]
-
-        # Check neighbors
-        neighbors = [
-            (x + 1, y),
-            (x - 1, y),
-            (x, y + 1),
-            (x, y - 1),
-            (x + 1, y + 1),
-            (x + 1, y - 1),
-            (x - 1, y + 1),
-            (x - 1, y - 1),
-        ]
+            # Flood fill to find connected region
+            region_count += 1
+            region_runs = self._flood_fill(runs, row_offsets, visited, run)
+            run_labels[np.asarray(region_runs) + 1] = region_count
 
-        for nx, ny in neighbors:
-            region.extend(self._flood_fill(grid, visited, nx, ny, threshold))
+        return run_labels[run_ids], region_count
 
-        return region
+    def _flood_fill(
+        self,
+        runs: Tuple[List[int], List[int], List[int]],
+        row_offsets: List[int],
+        visited: List[bool],
+        run: int,
+    ) -> List[int]:
+        """
+        Perform flood fill to find connected regions in the density grid.
+
+        Cells are connected to their 8 neighbours, so a run is connected to
+        the runs in the rows above and below that overlap it or touch it
+        diagonally.
+
+        Args:
+            runs: Row, start column and stop column of each run, in row order
+            row_offsets: Index of the first run in each row, followed by the
+                number of runs
+            visited: Flags marking the runs already assigned to a region
+            run: Index of the starting run
+
+        Returns:
+            Indices of the runs in the connected region
+        """
+        rows, starts, stops = runs
+        height = len(row_offsets) - 1
+        region_runs = []
+        visited[run] = True
+        stack = [run]
+
+        while stack:
+            run = stack.pop()
+            region_runs.append(run)
+            row = rows[run]
+            left, right = starts[run] - 1, stops[run] + 1
+
+            for neighbour_row in (row - 1, row + 1):
+                if not 0 <= neighbour_row < height:
+                    continue
+
+                # Runs in a row are sorted and disjoint, so the overlapping
+                # ones follow the first run that stops past the left edge
+                neighbour = bisect_right(
+                    stops,
+                    left,
+                    row_offsets[neighbour_row],
+                    row_offsets[neighbour_row + 1],
+                )
+                while (
+                    neighbour < row_offsets[neighbour_row + 1]
+                    and starts[neighbour] < right
+                ):
+                    if not visited[neighbour]:
+                        visited[neighbour] = True
+                        stack.append(neighbour)
+                    neighbour += 1
+
+        return region_runs
 
     def _identify_columns(
-        self, blocks: List[TextBlock], page_width: float
+        self, blocks: Union[List[TextBlock], np.ndarray], page_width: float
     ) -> List[Dict[str, Any]]:
         """
         Identify columns on the page.
 
         Args:
-            blocks: List of text blocks on the page
+            blocks: List of text blocks on the page, or their (N, 4) array of
+                bounding boxes
             page_width: Width of the page
 
         Returns:
             List of identified columns
         """
-        if not blocks:
+        if len(blocks) == 0:
             return []
 
-        # Collect x-coordinates of all blocks
-        x_starts = [block.bbox[0] for block in blocks]
-        # We only need the starting x-coordinates for column detection
-
-        # Use clustering to identify column boundaries
-        x_coords = sorted(set(x_starts))
+        # Use clustering to identify column boundaries. Only the left edges
+        # are needed to rule out a single column, so read those first.
+        if isinstance(blocks, np.ndarray):
+            x_starts = blocks.reshape(-1, 4)[:, 0]
+        else:
+            x_starts = np.fromiter(
+                (block.bbox[0] for block in blocks), dtype=np.float64, count=len(blocks)
+            )
+        x_coords = np.unique(x_starts)
 
         if len(x_coords) < 2:
             return []
 
-        # Find gaps between x-coordinates
-        gaps = []
-        for i in range(1, len(x_coords)):
-            gap = x_coords[i] - x_coords[i - 1]
-            if gap > 20:  # Minimum gap for a column boundary
-                gaps.append((gap, (x_coords[i - 1], x_coords[i])))
+        bboxes = self._bbox_array(blocks)
 
-        # Sort gaps by size (largest first)
-        gaps.sort(reverse=True)
+        # Find gaps between x-coordinates
+        gaps = np.diff(x_coords)
+        gap_indices = np.flatnonzero(gaps > 20)  # Minimum gap for a column boundary
 
-        # Take the top N gaps as column boundaries
+        # Take the top N gaps as column boundaries, largest first and the
+        # rightmost of equal gaps first
         max_columns = 5  # Maximum number of columns to detect
-        column_boundaries = []
-
-        for i, (gap, (x1, x2)) in enumerate(gaps):
-            if i >= max_columns - 1:
-                break
+        largest = np.lexsort((-x_coords[gap_indices], -gaps[gap_indices]))
+        gap_indices = gap_indices[largest[: max_columns - 1]]
 
-            # Add the midpoint of the gap as a boundary
-            column_boundaries.append((x1 + x2) / 2)
-
-        # Sort boundaries
-        column_boundaries.sort()
+        # Add the midpoint of each gap as a boundary, sorted
+        column_boundaries = np.sort(
+            (x_coords[gap_indices] + x_coords[gap_indices + 1]) / 2
+        ).tolist()
 
         # Add start and end boundaries
         column_boundaries = [0] + column_boundaries + [page_width]
 
-        # Create column objects
-        columns = []
-        for i in range(len(column_boundaries) - 1):
-            left = column_boundaries[i]
-            right = column_boundaries[i + 1]
-
-            # Find blocks in this column
-            column_blocks = [
-                block
-                for block in blocks
-                if block.bbox[0] >= left and block.bbox[2] <= right
-            ]
-
-            if column_blocks:
-                columns.append(
-                    {
-                        "index": i,
-                        "bbox": (
-                            left,
-                            0,
-                            right,
-                            max(block.bbox[3] for block in column_blocks),
-                        ),
-                        "block_count": len(column_blocks),
-                    }
-                )
+        # Find the blocks in every column at once, one row per column
+        lefts = np.asarray(column_boundaries[:-1], dtype=np.float64)
+        rights = np.asarray(column_boundaries[1:], dtype=np.float64)
+        in_column = (bboxes[:, 0] >= lefts[:, None]) & (bboxes[:, 2] <= rights[:, None])
+        block_counts = np.count_nonzero(in_column, axis=1).tolist()
+        bottoms = np.where(in_column, bboxes[:, 3], -np.inf).max(axis=1).tolist()
 
-        return columns
+        # Create column objects
+        return [
+            {
+                "index": i,
+                "bbox": (column_boundaries[i], 0, column_boundaries[i + 1], bottoms[i]),
+                "block_count": block_counts[i],
+            }
+            for i in range(len(block_counts))
+            if block_counts[i]
+        ]
 
     def _extract_metadata(self) -> Dict[str, Any]:
         """
         Extract metadata from the PDF document.
 
+        The metadata is read once per loaded document and reused afterwards.
+
         Returns:
             A dictionary containing the PDF metadata
         """
         if not self.document:
             return {}
 
-        metadata = self.document.metadata
-
-        # Clean up metadata
-        cleaned_metadata = {}
-        for key, value in metadata.items():
-            if value and isinstance(value, str):
-                cleaned_metadata[key] = value
+        if self._metadata_cache is None:
+            # Clean up metadata
+            self._metadata_cache = {
+                key: value
+                for key, value in self.document.metadata.items()
+                if value and isinstance(value, str)
+            }
 
-        return cleaned_metadata
+        return self._metadata_cache
 
     def close(self):
         """Close the PDF document and release resources."""
         if self.document:
-            try:
-                self.document.close()
-            except (AttributeError, TypeError):
-                # Handle case where document might be a mock in tests
-                pass
-            # Always set document to None to pass the test
+            self.document.close()
             self.document = None
+            self._page_dims = None
+            self._block_array = None
+            self._block_array_source = None
+            self._metadata_cache = None
             logger.info("Closed PDF document")
 
     def get_text_for_pii_detection(self) -> Dict[str, Any]:
@@ -1108,13 +1582,17 @@ class PDFParser:
             "layout_map": [],
         }
 
+        blocks = self._blocks_as_array()
+
         # Process text blocks by section
         section_texts = {}
         for section_name, block_indices in self.document_structure.sections.items():
-            section_blocks = [self.text_blocks[i] for i in block_indices]
-
             # Sort blocks by page, then by vertical position
-            section_blocks.sort(key=lambda b: (b.page, b.bbox[1]))
+            block_indices = np.asarray(block_indices, dtype=np.intp)
+            order = np.lexsort(
+                (blocks.bbox[block_indices, 1], blocks.page[block_indices])
+            )
+            section_blocks = [self.text_blocks[i] for i in block_indices[order]]
 
             # Combine text from all blocks in this section
             section_text = " ".join([block.text for block in section_blocks])
@@ -1129,9 +1607,7 @@ class PDFParser:
 
         # Process tables
         for table in self.tables:
-            table_text = ""
-            for cell in table.cells:
-                table_text += cell["text"] + " "
+            table_text = " ".join(cell["text"] for cell in table.cells)
 
             document_text["tables"].append(
                 {
@@ -1144,15 +1620,15 @@ class PDFParser:
                 }
             )
 
-        # Create a full text representation with layout markers
-        full_text = ""
+        # Create a full text representation with layout markers. The text is
+        # collected in parts and joined once, tracking the length so far.
+        text_parts = []
+        text_length = 0
         text_blocks = []
         layout_map = []
 
         # Sort all blocks by page and position
-        all_blocks = sorted(
-            self.text_blocks, key=lambda b: (b.page, b.bbox[1], b.bbox[0])
-        )
+        all_blocks = [self.text_blocks[i] for i in self._sorted_block_indices()]
 
         current_page = 0
         current_y = 0
@@ -1160,18 +1636,22 @@ class PDFParser:
         for block in all_blocks:
             # Add page break marker if needed
             if block.page > current_page:
-                full_text += "\n\n--- PAGE BREAK ---\n\n"
+                text_parts.append(PAGE_BREAK_MARKER)
+                text_length += len(PAGE_BREAK_MARKER)
                 current_page = block.page
                 current_y = 0
 
             # Add newline if significant vertical gap
             if current_y > 0 and block.bbox[1] - current_y > 15:
-                full_text += "\n"
+                text_parts.append("\n")
+                text_length += 1
 
             # Add the block text
-            start_pos = len(full_text)
-            full_text += block.text + " "
-            end_pos = len(full_text) - 1
+            start_pos = text_length
+            text_parts.append(block.text)
+            text_parts.append(" ")
+            end_pos = start_pos + len(block.text)
+            text_length = end_pos + 1
 
             # Update current position
             current_y = block.bbox[3]
@@ -1197,7 +1677,7 @@ class PDFParser:
                 }
             )
 
-        document_text["full_text"] = full_text
+        document_text["full_text"] = "".join(text_parts)
         document_text["text_blocks"] = text_blocks
         document_text["layout_map"] = layout_map
 
@@ -1220,94 +1700,67 @@ class PDFParser:
         """
         document_text = self.get_text_for_pii_detection()
 
+        # Bucket blocks and tables by section in a single pass each
+        blocks_by_section = defaultdict(list)
+        for block in document_text["text_blocks"]:
+            blocks_by_section[block["section"]].append(block)
+        tables_by_section = defaultdict(list)
+        for table in document_text["tables"]:
+            tables_by_section[table["section"]].append(table)
+
         chunks = []
 
         # First, try to chunk by sections
         for section_name, section_data in document_text["sections"].items():
             section_text = section_data["text"]
+            section_blocks = blocks_by_section.get(section_name, [])
+            section_tables = tables_by_section.get(section_name, [])
 
             # If section is small enough, use it as a chunk
             if len(section_text) <= max_chunk_size:
-                # Find text blocks in this section
-                section_blocks = [
-                    block
-                    for block in document_text["text_blocks"]
-                    if block["section"] == section_name
-                ]
-
                 chunks.append(
                     {
                         "text": section_text,
                         "section": section_name,
                         "blocks": section_blocks,
-                        "tables": [
-                            table
-                            for table in document_text["tables"]
-                            if table["section"] == section_name
-                        ],
+                        "tables": section_tables,
                     }
                 )
             else:
-                # Section is too large, split it further
-                section_blocks = [
-                    block
-                    for block in document_text["text_blocks"]
-                    if block["section"] == section_name
-                ]
-
-                # Sort blocks by page and position
-                section_blocks.sort(
-                    key=lambda b: (b["page"], b["bbox"][1], b["bbox"][0])
-                )
-
-                current_chunk = {
-                    "text": "",
-                    "section": section_name,
-                    "blocks": [],
-                    "tables": [],
-                }
+                # Section is too large, split it further. The text blocks are
+                # already in reading order, so the section's blocks are too.
+                current_chunk = _ChunkState(section=section_name)
 
                 for block in section_blocks:
                     # If adding this block would exceed the chunk size, start a new chunk
-                    current_text_len = len(current_chunk["text"])
                     block_text_len = len(block["text"])
                     if (
-                        current_text_len + block_text_len > max_chunk_size
-                        and current_chunk["text"]
+                        current_chunk.length + block_text_len > max_chunk_size
+                        and current_chunk.length
                     ):
-                        chunks.append(current_chunk)
-                        current_chunk = {
-                            "text": "",
-                            "section": section_name,
-                            "blocks": [],
-                            "tables": [],
-                        }
+                        chunks.append(current_chunk.to_chunk())
+                        current_chunk = _ChunkState(section=section_name)
 
                     # Add block to current chunk
-                    if current_chunk["text"]:
-                        current_chunk["text"] += " "
-
-                    current_chunk["text"] += block["text"]
-                    current_chunk["blocks"].append(block)
+                    current_chunk.add(block, block_text_len)
 
                 # Add any tables in this section to the appropriate chunk
-                for table in document_text["tables"]:
-                    if table["section"] == section_name:
-                        # Find the chunk that contains the table's position
-                        table_page = table["page"]
-
-                        for chunk in chunks:
-                            if chunk["section"] == section_name:
-                                chunk_pages = set(
-                                    block["page"] for block in chunk["blocks"]
-                                )
-                                if table_page in chunk_pages:
-                                    chunk["tables"].append(table)
-                                    break
+                for table in section_tables:
+                    # Find the chunk that contains the table's position
+                    table_page = table["page"]
+
+                    for chunk in chunks:
+                        if chunk["section"] == section_name:
+                            chunk_pages = set(
+                                block["page"] for block in chunk["blocks"]
+                            )
+                            if table_page in chunk_pages:
+                                chunk["tables"].append(table)
+                                break
 
                 # Add the last chunk if it's not empty
-                if current_chunk["text"]:
-                    chunks.append(current_chunk)
+                if current_chunk.length:
+                    chunks.append(current_chunk.to_chunk())
 
         # Add position mapping to each chunk
         for chunk in chunks:
@@ -10,17 +10,89 @@ before sharing bank statements.
 
 import json
 import logging
-import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Any, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from stmt_obfuscator.config import OLLAMA_HOST, DEFAULT_MODEL, CONFIDENCE_THRESHOLD
+try:
+    import orjson
+except ImportError:  # Optional faster JSON parser
+    orjson = None
+
+from stmt_obfuscator.config import (
+    OLLAMA_HOST,
+    OLLAMA_KEEP_ALIVE,
+    OLLAMA_NUM_PARALLEL,
+    DEFAULT_MODEL,
+    CONFIDENCE_THRESHOLD,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# orjson's decode errors subclass json.JSONDecodeError, so callers only catch that
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# Instructions that start every PII detection prompt
+_PROMPT_HEAD = """
+You are a specialized PII (Personally Identifiable Information) detection system for bank statements.
+
+Analyze the following bank statement text and identify ALL instances of PII. 
+For each PII instance found, provide:
+1. The type of PII (e.g., PERSON_NAME, ADDRESS, ACCOUNT_NUMBER, PHONE_NUMBER, EMAIL, etc.)
+2. The exact text that contains the PII
+3. The start and end position of the PII in the text (character index)
+
+Return your findings in a structured JSON format like this:
+{
+  "entities": [
+    {
+      "type": "PERSON_NAME",
+      "text": "John Doe",
+      "start": 10,
+      "end": 18,
+      "confidence": 0.95
+    },
+    {
+      "type": "ACCOUNT_NUMBER",
+      "text": "1234567890",
+      "start": 42,
+      "end": 52,
+      "confidence": 0.98
+    }
+  ]
+}
+
+Only include actual PII in your response. Do not include transaction amounts, dates, or other non-PII information.
+"""
+
+# Replaces the response format of _PROMPT_HEAD when several chunks share a prompt
+_MARSHALLED_PROMPT_FORMAT = """
+The bank statement text below is split into numbered chunks, each starting with
+a "=== CHUNK <id> ===" line. Instead of the format above, report the PII of
+every chunk separately, with the start and end positions counted from the
+beginning of that chunk's text, in this JSON format:
+{
+  "chunks": [
+    {
+      "id": 0,
+      "entities": [
+        {
+          "type": "PERSON_NAME",
+          "text": "John Doe",
+          "start": 10,
+          "end": 18,
+          "confidence": 0.95
+        }
+      ]
+    }
+  ]
+}
+"""
+
 
 class PIIDetector:
     """PII Detector for identifying personally identifiable information in text.
@@ -49,6 +121,14 @@ class PIIDetector:
         self.model = model
         self.host = host
         self.confidence_threshold = CONFIDENCE_THRESHOLD
+
+        # Reuse connections to Ollama across requests
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4, pool_maxsize=max(OLLAMA_NUM_PARALLEL, 8)
+        )
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
         
         logger.info(f"Initialized PII detector with model: {model}")
 
@@ -87,6 +167,114 @@ class PIIDetector:
         logger.info(f"Detected {len(pii_entities['entities'])} PII entities")
         return pii_entities
 
+    def detect_pii_batch(
+        self,
+        texts: List[str],
+        rag_context: Optional[Dict[str, Any]] = None,
+        max_workers: int = OLLAMA_NUM_PARALLEL,
+    ) -> List[Dict[str, Any]]:
+        """Detect PII in several texts, such as the chunks of a document.
+        
+        Each call to Ollama mostly waits on the server, so the texts are sent
+        concurrently from a thread pool sharing the detector's HTTP session.
+        Ollama only works on OLLAMA_NUM_PARALLEL requests per model at once and
+        queues the rest, so sending more than that gains nothing. Set the
+        OLLAMA_NUM_PARALLEL environment variable to the server's value.
+        
+        Args:
+            texts (List[str]): The texts to analyze for PII.
+            rag_context (Optional[Dict[str, Any]]): Additional context from RAG
+                to enhance detection. Defaults to None.
+            max_workers (int): Maximum number of requests in flight. Defaults to
+                config.OLLAMA_NUM_PARALLEL.
+        
+        Returns:
+            List[Dict[str, Any]]: The detected PII entities of each text, in the
+                same order and format as returned by detect_pii.
+        """
+        if len(texts) <= 1 or max_workers <= 1:
+            return [self.detect_pii(text, rag_context) for text in texts]
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(texts))) as executor:
+            return list(
+                executor.map(lambda text: self.detect_pii(text, rag_context), texts)
+            )
+
+    def detect_pii_marshalled(
+        self,
+        texts: List[str],
+        rows_per_call: int = 8,
+        rag_context: Optional[Dict[str, Any]] = None,
+        offsets: Optional[List[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Detect PII in several texts, sending a group of them per prompt.
+        
+        The instructions of a prompt and each request to Ollama have a fixed
+        cost, which dominates for short texts such as small document chunks.
+        Sending rows_per_call texts in one prompt spreads that cost over them.
+        Larger groups make each response longer and slower to generate, so
+        stop increasing rows_per_call once the time per text no longer drops.
+        
+        Args:
+            texts (List[str]): The texts to analyze for PII.
+            rows_per_call (int): Number of texts sent in each prompt.
+                Defaults to 8.
+            rag_context (Optional[Dict[str, Any]]): Additional context from RAG
+                to enhance detection. Defaults to None.
+            offsets (Optional[List[int]]): Position of each text in the whole
+                document. If given, entity positions are shifted by it so they
+                refer to the document instead of the text. Defaults to None.
+        
+        Returns:
+            List[Dict[str, Any]]: The detected PII entities of each text, in the
+                same order and format as returned by detect_pii.
+        """
+        rows_per_call = max(rows_per_call, 1)
+        results = []
+        for group_start in range(0, len(texts), rows_per_call):
+            group = texts[group_start : group_start + rows_per_call]
+            prompt = self._create_marshalled_prompt(group, rag_context)
+            response = self._send_to_ollama(prompt)
+            results.extend(self._parse_marshalled_response(response, len(group)))
+
+        if offsets is not None:
+            for result, offset in zip(results, offsets):
+                for entity in result["entities"]:
+                    for key in ("start", "end"):
+                        if isinstance(entity.get(key), int):
+                            entity[key] += offset
+
+        logger.info(
+            f"Detected {sum(len(result['entities']) for result in results)} "
+            f"PII entities in {len(texts)} texts"
+        )
+        return results
+
+    def close(self) -> None:
+        """Close the pooled connections to Ollama.
+        
+        The detector can still be used afterwards; new connections are opened
+        as needed.
+        """
+        self._session.close()
+
+    def filter_by_confidence(self, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the entities that meet the confidence threshold.
+        
+        Args:
+            entities (List[Dict[str, Any]]): The detected PII entities.
+        
+        Returns:
+            List[Dict[str, Any]]: The entities with a confidence of at least the
+                threshold; entities without a confidence are kept.
+        """
+        threshold = self.confidence_threshold
+        get = dict.get
+        return [
+            entity for entity in entities
+            if get(entity, "confidence", 1.0) >= threshold
+        ]
+
     def _create_prompt(self, text: str, rag_context: Optional[Dict[str, Any]] = None) -> str:
         """Create a prompt for PII detection.
         
@@ -94,6 +282,10 @@ class PIIDetector:
         provided text. If RAG context is provided, it is included in the prompt
         to help the model identify ambiguous PII.
         
+        Every prompt starts with the same instructions and ends with the text,
+        so Ollama can reuse its cached processing of the shared prefix between
+        requests. Keep anything that varies per call after the instructions.
+        
         Args:
             text (str): The text to analyze for PII.
             rag_context (Optional[Dict[str, Any]]): Optional RAG context to enhance
@@ -102,49 +294,57 @@ class PIIDetector:
         Returns:
             str: A formatted prompt string for the LLM.
         """
-        # Base prompt
-        prompt = f"""
-You are a specialized PII (Personally Identifiable Information) detection system for bank statements.
+        parts = [_PROMPT_HEAD]
 
-Analyze the following bank statement text and identify ALL instances of PII. 
-For each PII instance found, provide:
-1. The type of PII (e.g., PERSON_NAME, ADDRESS, ACCOUNT_NUMBER, PHONE_NUMBER, EMAIL, etc.)
-2. The exact text that contains the PII
-3. The start and end position of the PII in the text (character index)
+        # Add RAG context if provided
+        if rag_context:
+            parts.append(self._format_rag_context(rag_context))
 
-Return your findings in a structured JSON format like this:
-{{
-  "entities": [
-    {{
-      "type": "PERSON_NAME",
-      "text": "John Doe",
-      "start": 10,
-      "end": 18,
-      "confidence": 0.95
-    }},
-    {{
-      "type": "ACCOUNT_NUMBER",
-      "text": "1234567890",
-      "start": 42,
-      "end": 52,
-      "confidence": 0.98
-    }}
-  ]
-}}
+        # Add the text to analyze
+        parts.append(f"\nBank statement text:\n{text}")
+        
+        return "".join(parts)
 
-Only include actual PII in your response. Do not include transaction amounts, dates, or other non-PII information.
-"""
+    def _create_marshalled_prompt(
+        self, texts: List[str], rag_context: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Create a prompt for PII detection in several numbered texts.
+        
+        Args:
+            texts (List[str]): The texts to analyze for PII, numbered from 0.
+            rag_context (Optional[Dict[str, Any]]): Optional RAG context to enhance
+                detection. Defaults to None.
+        
+        Returns:
+            str: A formatted prompt string for the LLM.
+        """
+        parts = [_PROMPT_HEAD, _MARSHALLED_PROMPT_FORMAT]
 
         # Add RAG context if provided
         if rag_context:
-            prompt += "\n\nAdditional context for detection:\n"
-            for key, value in rag_context.items():
-                prompt += f"{key}: {value}\n"
+            parts.append(self._format_rag_context(rag_context))
 
-        # Add the text to analyze
-        prompt += f"\nBank statement text:\n{text}"
+        # Add the numbered texts to analyze
+        parts.append("\nBank statement text:\n")
+        for chunk_id, text in enumerate(texts):
+            parts.append(f"=== CHUNK {chunk_id} ===\n{text}\n")
+
+        return "".join(parts)
+
+    def _format_rag_context(self, rag_context: Dict[str, Any]) -> str:
+        """Format RAG context for a prompt.
+        
+        The entries are sorted by key, so the same context always gives the same
+        prompt text and chunks sharing it share a longer cached prefix.
+        
+        Args:
+            rag_context (Dict[str, Any]): RAG context to enhance detection.
         
-        return prompt
+        Returns:
+            str: The context section of the prompt.
+        """
+        lines = [f"{key}: {value}\n" for key, value in sorted(rag_context.items())]
+        return "".join(["\n\nAdditional context for detection:\n", *lines])
 
     def _send_to_ollama(self, prompt: str) -> str:
         """Send a prompt to Ollama and get the response.
@@ -163,19 +363,38 @@ Only include actual PII in your response. Do not include transaction amounts, da
                 connection issues or API errors.
         """
         try:
-            response = requests.post(
+            # Stream the response so it is read while the model generates it
+            response = self._session.post(
                 f"{self.host}/api/generate",
                 json={
                     "model": self.model,
                     "prompt": prompt,
-                    "stream": False,
+                    "stream": True,
+                    "keep_alive": OLLAMA_KEEP_ALIVE,
                 },
                 timeout=60,
+                stream=True,
             )
             
-            response.raise_for_status()
-            return response.json()["response"]
-        except requests.exceptions.RequestException as e:
+            try:
+                response.raise_for_status()
+                
+                # Each line is a JSON object with the next piece of the text
+                parts = []
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = _json_loads(line)
+                    if "error" in chunk:
+                        raise requests.exceptions.RequestException(chunk["error"])
+                    parts.append(chunk.get("response", ""))
+                    if chunk.get("done"):
+                        break
+                
+                return "".join(parts)
+            finally:
+                response.close()
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
             logger.error(f"Error communicating with Ollama: {e}")
             raise Exception(f"Error communicating with Ollama: {e}")
 
@@ -194,26 +413,60 @@ Only include actual PII in your response. Do not include transaction amounts, da
                 an empty entities list.
         """
         try:
-            # Extract JSON from the response
-            json_match = re.search(r'({[\s\S]*})', response)
-            if json_match:
-                json_str = json_match.group(1)
-                data = json.loads(json_str)
-                
-                # Filter entities by confidence threshold
-                if "entities" in data:
-                    data["entities"] = [
-                        entity for entity in data["entities"]
-                        if entity.get("confidence", 1.0) >= self.confidence_threshold
-                    ]
-                
-                return data
-            else:
-                logger.warning("No JSON found in response")
-                return {"entities": []}
+            # The model usually answers with a bare JSON object, so try that
+            # before searching the response for one
+            try:
+                data = _json_loads(response)
+            except json.JSONDecodeError:
+                data = None
+
+            if not isinstance(data, dict):
+                # Otherwise take the text from the first "{" to the last "}"
+                json_start = response.find("{")
+                json_end = response.rfind("}")
+                if json_start == -1 or json_end < json_start:
+                    logger.warning("No JSON found in response")
+                    return {"entities": []}
+                data = _json_loads(response[json_start : json_end + 1])
+
+            # Filter entities by confidence threshold
+            if "entities" in data:
+                data["entities"] = self.filter_by_confidence(data["entities"])
+
+            return data
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing JSON response: {e}")
             return {"entities": []}
         except Exception as e:
             logger.error(f"Error processing response: {e}")
-            return {"entities": []}
\ No newline at end of file
+            return {"entities": []}
+
+    def _parse_marshalled_response(
+        self, response: str, chunk_count: int
+    ) -> List[Dict[str, Any]]:
+        """Parse a response to a prompt with several numbered texts.
+        
+        Args:
+            response (str): The text response from Ollama.
+            chunk_count (int): Number of texts in the prompt.
+        
+        Returns:
+            List[Dict[str, Any]]: The PII entities of each text, filtered by the
+                confidence threshold. Texts missing from the response, or all of
+                them if parsing fails, get an empty entities list.
+        """
+        results = [{"entities": []} for _ in range(chunk_count)]
+        data = self._parse_response(response)
+
+        try:
+            for chunk in data.get("chunks", []):
+                chunk_id = chunk.get("id")
+                if isinstance(chunk_id, int) and 0 <= chunk_id < chunk_count:
+                    results[chunk_id]["entities"].extend(
+                        self.filter_by_confidence(chunk.get("entities", []))
+                    )
+        except Exception as e:
+            logger.error(f"Error processing response: {e}")
+            return [{"entities": []} for _ in range(chunk_count)]
+
+        return results
@@ -14,6 +14,63 @@ from stmt_obfuscator.config import CONFIDENCE_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
+# Matches every character that is not a digit
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+def _mask_for(entity_type: str, text: str, prefix: str, mask_char: str) -> str:
+    """
+    Build the replacement for a PII entity.
+
+    Args:
+        entity_type: The type of PII entity
+        text: The original text
+        prefix: The replacement prefix of the entity's category
+        mask_char: The mask character of the entity's category
+
+    Returns:
+        The replacement text
+    """
+    # Special handling for different entity types
+    if entity_type == "ACCOUNT_NUMBER":
+        # Keep last 4 digits if available
+        if len(text) >= 4:
+            return f"XXXX-XXXX-XXXX-{text[-4:]}"
+        else:
+            return mask_char * len(text)
+    
+    elif entity_type == "PHONE_NUMBER":
+        # Format as (XXX) XXX-XXXX
+        digits = _NON_DIGIT_RE.sub('', text)
+        if len(digits) >= 10:
+            return f"({mask_char * 3}) {mask_char * 3}-{mask_char * 4}"
+        else:
+            return mask_char * len(text)
+    
+    elif entity_type == "EMAIL":
+        # Format as XXXX@XXXX.XXX
+        parts = text.split('@')
+        if len(parts) == 2:
+            domain_parts = parts[1].split('.')
+            if len(domain_parts) >= 2:
+                return f"{mask_char * 4}@{mask_char * 4}.{mask_char * 3}"
+        
+        return mask_char * len(text)
+    
+    elif entity_type == "PERSON_NAME":
+        # Replace each word with mask characters of the same length
+        words = text.split()
+        masked_words = [mask_char * len(word) for word in words]
+        return ' '.join(masked_words)
+    
+    elif entity_type == "ADDRESS":
+        # Replace with generic format
+        return f"{prefix}_{mask_char * (len(text) // 2)}"
+    
+    else:
+        # Default replacement
+        return f"{prefix}_{mask_char * (len(text) // 2)}"
+
 
 class PIIManager:
     """PII Manager for handling detected PII entities."""
@@ -27,7 +84,14 @@ class PIIManager:
         """
         self.confidence_threshold = confidence_threshold
         self.pii_entities = []
+        # Position of each entity ID in pii_entities, for the first entity with it
+        self._id_index: Dict[str, int] = {}
         self.replacement_map = {}
+        # Replacements built for the current document, keyed by
+        # (type, text, prefix, mask character). Entities with the same text
+        # recur throughout a statement; the cache holds PII, so it is dropped
+        # with each new set of entities.
+        self._replacement_cache: Dict[Tuple[str, str, str, str], str] = {}
         self.entity_categories = {
             "PERSON_NAME": {"prefix": "PERSON", "mask_char": "X"},
             "ADDRESS": {"prefix": "ADDRESS", "mask_char": "X"},
@@ -57,22 +121,28 @@ class PIIManager:
         """
         self.pii_entities = []
         self.replacement_map = {}
+        self._replacement_cache = {}
         
         # Filter entities by confidence threshold
+        threshold = self.confidence_threshold
+        get = dict.get
         filtered_entities = [
             entity for entity in detected_entities
-            if entity.get("confidence", 1.0) >= self.confidence_threshold
+            if get(entity, "confidence", 1.0) >= threshold
         ]
         
         # Process each entity
+        process_entity = self._process_entity
+        append_entity = self.pii_entities.append
+        replacement_map = self.replacement_map
         for entity in filtered_entities:
-            processed_entity = self._process_entity(entity)
-            self.pii_entities.append(processed_entity)
+            processed_entity = process_entity(entity)
+            append_entity(processed_entity)
             
             # Add to replacement map
-            original_text = processed_entity["text"]
-            replacement = processed_entity["replacement"]
-            self.replacement_map[original_text] = replacement
+            replacement_map[processed_entity["text"]] = processed_entity["replacement"]
+        
+        self._rebuild_id_index()
         
         logger.info(f"Processed {len(self.pii_entities)} PII entities")
         return self.pii_entities
@@ -97,27 +167,32 @@ class PIIManager:
         Returns:
             True if the entity was updated successfully, False otherwise
         """
-        for i, entity in enumerate(self.pii_entities):
-            if entity.get("id") == entity_id:
-                # Update entity
-                for key, value in updates.items():
-                    if key in entity:
-                        entity[key] = value
-                
-                # Regenerate replacement if needed
-                if "type" in updates or "text" in updates:
-                    entity["replacement"] = self._generate_replacement(
-                        entity["text"], entity["type"]
-                    )
-                    
-                    # Update replacement map
-                    self.replacement_map[entity["text"]] = entity["replacement"]
-                
-                logger.info(f"Updated PII entity: {entity_id}")
-                return True
+        i = self._id_index.get(entity_id)
+        if i is None:
+            logger.warning(f"PII entity not found: {entity_id}")
+            return False
+        
+        entity = self.pii_entities[i]
+        
+        # Update entity
+        for key, value in updates.items():
+            if key in entity:
+                entity[key] = value
+        
+        if "id" in updates:
+            self._rebuild_id_index()
+        
+        # Regenerate replacement if needed
+        if "type" in updates or "text" in updates:
+            entity["replacement"] = self._generate_replacement(
+                entity["text"], entity["type"]
+            )
+            
+            # Update replacement map
+            self.replacement_map[entity["text"]] = entity["replacement"]
         
-        logger.warning(f"PII entity not found: {entity_id}")
-        return False
+        logger.info(f"Updated PII entity: {entity_id}")
+        return True
 
     def add_entity(self, entity: Dict[str, Any]) -> str:
         """
@@ -142,6 +217,7 @@ class PIIManager:
             "confidence": entity.get("confidence", 1.0),
         })
         
+        self._id_index.setdefault(processed_entity["id"], len(self.pii_entities))
         self.pii_entities.append(processed_entity)
         
         # Add to replacement map
@@ -162,20 +238,29 @@ class PIIManager:
         Returns:
             True if the entity was removed successfully, False otherwise
         """
-        for i, entity in enumerate(self.pii_entities):
-            if entity.get("id") == entity_id:
-                # Remove from replacement map
-                if entity["text"] in self.replacement_map:
-                    del self.replacement_map[entity["text"]]
-                
-                # Remove entity
-                self.pii_entities.pop(i)
-                
-                logger.info(f"Removed PII entity: {entity_id}")
-                return True
+        i = self._id_index.get(entity_id)
+        if i is None:
+            logger.warning(f"PII entity not found: {entity_id}")
+            return False
+        
+        entity = self.pii_entities[i]
+        
+        # Remove from replacement map
+        if entity["text"] in self.replacement_map:
+            del self.replacement_map[entity["text"]]
         
-        logger.warning(f"PII entity not found: {entity_id}")
-        return False
+        # Remove entity; the entities after it move up one position
+        self.pii_entities.pop(i)
+        self._rebuild_id_index()
+        
+        logger.info(f"Removed PII entity: {entity_id}")
+        return True
+
+    def _rebuild_id_index(self):
+        """Recompute the position of each entity ID in pii_entities."""
+        self._id_index = {}
+        for i, entity in enumerate(self.pii_entities):
+            self._id_index.setdefault(entity.get("id"), i)
 
     def _process_entity(self, entity: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -219,45 +304,9 @@ class PIIManager:
             entity_type, {"prefix": "PII", "mask_char": "X"}
         )
         
-        prefix = category_info["prefix"]
-        mask_char = category_info["mask_char"]
-        
-        # Special handling for different entity types
-        if entity_type == "ACCOUNT_NUMBER":
-            # Keep last 4 digits if available
-            if len(text) >= 4:
-                return f"XXXX-XXXX-XXXX-{text[-4:]}"
-            else:
-                return mask_char * len(text)
-        
-        elif entity_type == "PHONE_NUMBER":
-            # Format as (XXX) XXX-XXXX
-            digits = re.sub(r'\D', '', text)
-            if len(digits) >= 10:
-                return f"({mask_char * 3}) {mask_char * 3}-{mask_char * 4}"
-            else:
-                return mask_char * len(text)
-        
-        elif entity_type == "EMAIL":
-            # Format as XXXX@XXXX.XXX
-            parts = text.split('@')
-            if len(parts) == 2:
-                domain_parts = parts[1].split('.')
-                if len(domain_parts) >= 2:
-                    return f"{mask_char * 4}@{mask_char * 4}.{mask_char * 3}"
-            
-            return mask_char * len(text)
-        
-        elif entity_type == "PERSON_NAME":
-            # Replace each word with mask characters of the same length
-            words = text.split()
-            masked_words = [mask_char * len(word) for word in words]
-            return ' '.join(masked_words)
-        
-        elif entity_type == "ADDRESS":
-            # Replace with generic format
-            return f"{prefix}_{mask_char * (len(text) // 2)}"
-        
-        else:
-            # Default replacement
-            return f"{prefix}_{mask_char * (len(text) // 2)}"
\ No newline at end of file
+        key = (entity_type, text, category_info["prefix"], category_info["mask_char"])
+        replacement = self._replacement_cache.get(key)
+        if replacement is None:
+            replacement = _mask_for(*key)
+            self._replacement_cache[key] = replacement
+        return replacement
\ No newline at end of file
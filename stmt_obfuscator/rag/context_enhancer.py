@@ -7,6 +7,7 @@ that can be used to improve detection accuracy in ambiguous cases. The module is
 be optional and can be enabled or disabled through configuration.
 """
 
+import hashlib
 import logging
 import os
 from pathlib import Path
@@ -99,38 +100,91 @@ class RAGContextEnhancer:
                 n_results=top_k
             )
             
-            if not results["documents"] or not results["documents"][0]:
-                logger.info("No relevant context found in RAG")
-                return None
+            return self._build_context(results, 0)
             
-            # Build context from results
-            context = {
-                "patterns": [],
-                "examples": []
-            }
-            
-            for i, doc in enumerate(results["documents"][0]):
-                metadata = results["metadatas"][0][i] if results["metadatas"] and results["metadatas"][0] else {}
-                pattern_type = metadata.get("type", "UNKNOWN")
-                
-                context["patterns"].append({
-                    "type": pattern_type,
-                    "pattern": doc,
-                    "score": results["distances"][0][i] if results["distances"] and results["distances"][0] else 0
-                })
-                
-                if "example" in metadata:
-                    context["examples"].append({
-                        "type": pattern_type,
-                        "text": metadata["example"]
-                    })
+        except Exception as e:
+            logger.error(f"Error retrieving context from RAG: {e}")
+            return None
+    
+    def get_contexts(self, text_chunks: List[str], top_k: int = 5) -> List[Optional[Dict[str, Any]]]:
+        """Get context for several text chunks with a single query.
+        
+        ChromaDB embeds and searches all the chunks of one query together, so
+        this is faster than calling get_context for each chunk of a document.
+        
+        Args:
+            text_chunks (List[str]): The text chunks to get context for.
+            top_k (int): The number of top results to return per chunk.
+                Defaults to 5.
+        
+        Returns:
+            List[Optional[Dict[str, Any]]]: The context of each chunk, in the
+                format returned by get_context. Chunks get None if RAG is
+                disabled, no relevant context is found, or the query fails.
+        """
+        if not self.enabled:
+            logger.info("RAG is disabled, skipping context enhancement")
+            return [None] * len(text_chunks)
+        
+        if not text_chunks:
+            return []
+        
+        try:
+            # Query the collection for patterns similar to every chunk at once
+            results = self.collection.query(
+                query_texts=list(text_chunks),
+                n_results=top_k
+            )
             
-            logger.info(f"Found {len(context['patterns'])} relevant patterns for context enhancement")
-            return context
+            return [self._build_context(results, i) for i in range(len(text_chunks))]
             
         except Exception as e:
             logger.error(f"Error retrieving context from RAG: {e}")
+            return [None] * len(text_chunks)
+    
+    def _build_context(self, results: Dict[str, Any], index: int) -> Optional[Dict[str, Any]]:
+        """Build the context of one query text from ChromaDB query results.
+        
+        Args:
+            results (Dict[str, Any]): The results of a collection query.
+            index (int): The position of the query text in the query.
+        
+        Returns:
+            Optional[Dict[str, Any]]: A dictionary with 'patterns' and 'examples'
+                lists, or None if no relevant context was found.
+        """
+        documents = results["documents"]
+        if not documents or index >= len(documents) or not documents[index]:
+            logger.info("No relevant context found in RAG")
             return None
+        
+        metadatas = results["metadatas"][index] if results["metadatas"] else None
+        distances = results["distances"][index] if results["distances"] else None
+        
+        # Build context from results
+        context = {
+            "patterns": [],
+            "examples": []
+        }
+        
+        for i, doc in enumerate(documents[index]):
+            metadata = metadatas[i] if metadatas else {}
+            pattern_type = metadata.get("type", "UNKNOWN")
+            
+            context["patterns"].append({
+                "type": pattern_type,
+                "pattern": doc,
+                "score": distances[i] if distances else 0
+            })
+            
+            if "example" in metadata:
+                context["examples"].append({
+                    "type": pattern_type,
+                    "text": metadata["example"]
+                })
+        
+        logger.info(f"Found {len(context['patterns'])} relevant patterns for context enhancement")
+        return context
     
     def add_pattern(self, pattern: str, pattern_type: str, example: Optional[str] = None) -> bool:
         """Add a PII pattern to the RAG knowledge base.
@@ -159,10 +213,8 @@ class RAGContextEnhancer:
             if example:
                 metadata["example"] = example
             
-            self.collection.add(
-                documents=[pattern],
-                metadatas=[metadata],
-                ids=[f"{pattern_type}_{len(pattern)}_{hash(pattern) % 10000}"]
+            self._add_batch(
+                [pattern], [metadata], [self._pattern_id(pattern, pattern_type)]
             )
             
             logger.info(f"Added pattern to RAG: {pattern_type}")
@@ -172,6 +224,35 @@ class RAGContextEnhancer:
             logger.error(f"Error adding pattern to RAG: {e}")
             return False
     
+    def _add_batch(self, patterns: List[str], metadatas: List[Dict[str, Any]], ids: List[str]) -> None:
+        """Add several patterns to the ChromaDB collection in one call.
+        
+        Args:
+            patterns (List[str]): The patterns to add.
+            metadatas (List[Dict[str, Any]]): The metadata of each pattern.
+            ids (List[str]): The ID of each pattern.
+        """
+        self.collection.add(
+            documents=patterns,
+            metadatas=metadatas,
+            ids=ids
+        )
+    
+    @staticmethod
+    def _pattern_id(pattern: str, pattern_type: str) -> str:
+        """Get the ID a pattern is stored under in the ChromaDB collection.
+        
+        Args:
+            pattern (str): The pattern.
+            pattern_type (str): The type of PII pattern.
+        
+        Returns:
+            str: The pattern ID.
+        """
+        # blake2b is stable across processes, unlike the salted builtin hash
+        digest = hashlib.blake2b(pattern.encode("utf-8"), digest_size=8).hexdigest()
+        return f"{pattern_type}_{digest}"
+    
     def initialize_knowledge_base(self) -> bool:
         """Initialize the knowledge base with common PII patterns.
         
@@ -249,12 +330,18 @@ class RAGContextEnhancer:
                 }
             ]
             
+            # Add all patterns with one embedding batch and index write
+            documents, metadatas, ids = [], [], []
             for pattern_info in patterns:
-                self.add_pattern(
-                    pattern=pattern_info["pattern"],
-                    pattern_type=pattern_info["type"],
-                    example=pattern_info.get("example")
-                )
+                metadata = {"type": pattern_info["type"]}
+                if pattern_info.get("example"):
+                    metadata["example"] = pattern_info["example"]
+                
+                documents.append(pattern_info["pattern"])
+                metadatas.append(metadata)
+                ids.append(self._pattern_id(pattern_info["pattern"], pattern_info["type"]))
+            
+            self._add_batch(documents, metadatas, ids)
             
             logger.info(f"Initialized knowledge base with {len(patterns)} patterns")
             return True
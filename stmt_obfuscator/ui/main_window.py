@@ -46,11 +46,15 @@ from PyQt6.QtWidgets import (
 )
 # Already imported QTextCursor above
 
+from stmt_obfuscator.config import PREVIEW_CACHE_DIR, PREVIEW_DISK_CACHE_ENABLED
 from stmt_obfuscator.pdf_parser.parser import PDFParser
 from stmt_obfuscator.pii_detection.detector import PIIDetector
 from stmt_obfuscator.obfuscation.obfuscator import Obfuscator
 from stmt_obfuscator.output_generator.generator import OutputGenerator
-from stmt_obfuscator.output_generator.pdf_preview import PDFPreviewGenerator
+from stmt_obfuscator.output_generator.pdf_preview import (
+    PDFPreviewGenerator,
+    PDFPreviewRenderer,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -286,10 +290,33 @@ class MainWindow(QMainWindow):
         self.document_text = ""
         self.entity_inclusion = {}  # Track which entities to include in obfuscation
 
+        # Keep one preview generator so rendered previews are cached between runs
+        self.pdf_preview_generator = PDFPreviewGenerator(
+            disk_cache_dir=PREVIEW_CACHE_DIR if PREVIEW_DISK_CACHE_ENABLED else None
+        )
+
+        # Render PDF previews off the GUI thread, one renderer per preview pane
+        self.original_pdf_renderer = PDFPreviewRenderer(self.pdf_preview_generator, self)
+        self.obfuscated_pdf_renderer = PDFPreviewRenderer(
+            self.pdf_preview_generator, self
+        )
+
         # Initialize UI components
         self._init_ui()
         self._create_menu()
 
+        # Add preview pages to their pane as they are rendered
+        self.original_pdf_renderer.pageReady.connect(
+            lambda page_num, pixmap: self._add_pdf_page(
+                self.original_pdf_layout, page_num, pixmap
+            )
+        )
+        self.obfuscated_pdf_renderer.pageReady.connect(
+            lambda page_num, pixmap: self._add_pdf_page(
+                self.obfuscated_pdf_layout, page_num, pixmap
+            )
+        )
+
         # Set up status bar
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
@@ -584,6 +611,7 @@ class MainWindow(QMainWindow):
             logger.info(f"Selected file: {file_path}")
 
             # Reset UI state
+            self._clear_pdf_preview_containers()
             self.progress_bar.setValue(0)
             self.tab_widget.setEnabled(False)
             self.save_button.setEnabled(False)
@@ -635,6 +663,9 @@ class MainWindow(QMainWindow):
         # Initialize entity inclusion map
         self.entity_inclusion = {i: True for i in range(len(self.pii_entities))}
 
+        # Drop the previews of the previous document
+        self._clear_pdf_preview_containers()
+
         # Update UI
         self.status_bar.showMessage(
             "Processing complete. Review detected PII entities."
@@ -920,6 +951,8 @@ class MainWindow(QMainWindow):
         quality_index = self.preview_quality.currentIndex()
         dpi_values = [100, 150, 300]  # Low, Medium, High
         preview_dpi = dpi_values[quality_index]
+        # Low quality renders at no more than the screen resolution
+        preview_quality = "fast" if quality_index == 0 else "high"
 
         # Show the original document
         self.original_preview.setText(self.document_text)
@@ -993,25 +1026,20 @@ class MainWindow(QMainWindow):
                 self.progress_bar.setValue(60)
                 self.status_bar.showMessage("Generating PDF previews...")
                 
-                # Create PDF preview generator
-                pdf_preview_generator = PDFPreviewGenerator()
-                
-                # Generate original document preview
+                # Render the original document preview; pages are added as
+                # they arrive
                 logger.info("Generating original PDF preview")
-                original_pixmaps = pdf_preview_generator.generate_preview(
-                    original_document, dpi=preview_dpi
+                self.original_pdf_renderer.render(
+                    original_document, dpi=preview_dpi, quality=preview_quality
                 )
                 
-                # Generate obfuscated document preview
+                # Render the obfuscated document preview
+                self.progress_bar.setValue(80)
                 logger.info("Generating obfuscated PDF preview")
-                obfuscated_pixmaps = pdf_preview_generator.generate_preview(
-                    obfuscated_document, dpi=preview_dpi
+                self.obfuscated_pdf_renderer.render(
+                    obfuscated_document, dpi=preview_dpi, quality=preview_quality
                 )
                 
-                # Display the PDF previews
-                self.progress_bar.setValue(80)
-                self._display_pdf_previews(original_pixmaps, obfuscated_pixmaps)
-                
                 # Switch to PDF view tabs
                 self.original_preview_stack.setCurrentIndex(1)
                 self.obfuscated_preview_stack.setCurrentIndex(1)
@@ -1042,7 +1070,10 @@ class MainWindow(QMainWindow):
             self.progress_bar.setValue(0)
     
     def _clear_pdf_preview_containers(self):
-        """Clear the PDF preview containers."""
+        """Stop rendering PDF previews and clear the PDF preview containers."""
+        self.original_pdf_renderer.cancel()
+        self.obfuscated_pdf_renderer.cancel()
+
         # Clear original PDF container
         while self.original_pdf_layout.count():
             item = self.original_pdf_layout.takeAt(0)
@@ -1055,43 +1086,26 @@ class MainWindow(QMainWindow):
             if item.widget():
                 item.widget().deleteLater()
     
-    def _display_pdf_previews(self, original_pixmaps, obfuscated_pixmaps):
-        """Display PDF preview pixmaps in the UI."""
-        # Display original document previews
-        for i, pixmap in enumerate(original_pixmaps):
-            page_label = QLabel(f"Page {i+1}")
-            page_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.original_pdf_layout.addWidget(page_label)
-            
-            image_label = QLabel()
-            image_label.setPixmap(pixmap)
-            image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.original_pdf_layout.addWidget(image_label)
-            
+    def _add_pdf_page(self, layout, page_num, pixmap):
+        """Display a PDF preview page in the UI as it is rendered."""
+        try:
             # Add some spacing between pages
-            if i < len(original_pixmaps) - 1:
+            if page_num > 0:
                 spacer = QFrame()
                 spacer.setFrameShape(QFrame.Shape.HLine)
                 spacer.setFrameShadow(QFrame.Shadow.Sunken)
-                self.original_pdf_layout.addWidget(spacer)
-        
-        # Display obfuscated document previews
-        for i, pixmap in enumerate(obfuscated_pixmaps):
-            page_label = QLabel(f"Page {i+1}")
+                layout.addWidget(spacer)
+            
+            page_label = QLabel(f"Page {page_num+1}")
             page_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.obfuscated_pdf_layout.addWidget(page_label)
+            layout.addWidget(page_label)
             
             image_label = QLabel()
             image_label.setPixmap(pixmap)
             image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.obfuscated_pdf_layout.addWidget(image_label)
-            
-            # Add some spacing between pages
-            if i < len(obfuscated_pixmaps) - 1:
-                spacer = QFrame()
-                spacer.setFrameShape(QFrame.Shape.HLine)
-                spacer.setFrameShadow(QFrame.Shadow.Sunken)
-                self.obfuscated_pdf_layout.addWidget(spacer)
+            layout.addWidget(image_label)
+        except Exception as e:
+            logger.error(f"Error displaying PDF preview page: {e}")
 
     def _on_save_file(self):
         """Handle saving the obfuscated file."""
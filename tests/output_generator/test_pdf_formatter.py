@@ -269,12 +269,31 @@ def test_get_text_width_with_fallback():
     # Test caching
     formatter.font_cache = {}  # Clear cache
     width1, font1 = formatter.get_text_width_with_fallback("Test", 12)
-    assert "Test:12" in formatter.font_cache
+    assert (formatter._font_key, "Test", 12) in formatter.font_cache
     width2, font2 = formatter.get_text_width_with_fallback("Test", 12)
     assert width1 == width2
     assert font1 == font2
 
 
+def test_width_cache_shared_between_formatters():
+    """Test that text widths are shared between formatters with the same fonts."""
+    formatter = PDFFormatter(font="Helvetica", font_fallbacks=["Courier"])
+    width, _ = formatter.get_text_width_with_fallback("Shared width", 12)
+
+    other = PDFFormatter(font="Helvetica", font_fallbacks=["Courier"])
+    assert other.font_cache is formatter.font_cache
+    assert other.font_cache[(other._font_key, "Shared width", 12)] == (
+        width,
+        "Helvetica",
+    )
+
+    # A different primary font must not reuse the cached width
+    times = PDFFormatter(font="Times-Roman", font_fallbacks=["Courier"])
+    times_width, times_font = times.get_text_width_with_fallback("Shared width", 12)
+    assert times_font == "Times-Roman"
+    assert times_width != width
+
+
 def test_insert_text_with_fallback():
     """Test inserting text with font fallbacks."""
     formatter = PDFFormatter()
@@ -467,3 +486,56 @@ def test_add_metadata_page(sample_document):
             text = pdf[0].get_text()
             assert "Document Metadata" in text
             assert "obfuscated: True" in text or "obfuscated:True" in text
+
+
+def test_finalize(sample_document):
+    """Test saving a formatted document with compression."""
+    formatter = PDFFormatter(preserve_layout=False)
+
+    # Format the document
+    pdf_doc = formatter.format_document(sample_document, fitz.open())
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = Path(temp_dir) / "test_finalize.pdf"
+        formatter.finalize(pdf_doc, output_path)
+
+        # Check that the saved file is a valid PDF with the same content
+        assert output_path.exists()
+        with fitz.open(output_path) as pdf:
+            assert len(pdf) == len(pdf_doc)
+            assert "Obfuscated Bank Statement" in pdf[0].get_text()
+
+    # Serializing to bytes uses the same compression as saving
+    pdf_bytes = formatter.to_bytes(pdf_doc)
+    assert len(pdf_bytes) < len(pdf_doc.tobytes())
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf:
+        assert len(pdf) == len(pdf_doc)
+
+
+def test_insert_text_with_fallback_font_runs():
+    """Test that the fallback path inserts one run per font change."""
+    formatter = PDFFormatter()
+
+    pdf_doc = fitz.open()
+    page = pdf_doc.new_page()
+
+    # Fail the whole-text insertion so the per-run fallback path is used
+    inserted = []
+    original_insert_text = page.insert_text
+
+    def insert_text(pos, text, fontname, **kwargs):
+        if "\n" in text:
+            raise ValueError("forced failure")
+        inserted.append((text, fontname))
+        return original_insert_text(pos, text, fontname=fontname, **kwargs)
+
+    page.insert_text = insert_text
+    formatter.insert_text_with_fallback(page, (72, 72), "Sum ∑ of Ωπ\nTotal", 12)
+
+    assert inserted == [
+        ("Sum ", formatter.font),
+        ("∑", "Symbol"),
+        (" of ", formatter.font),
+        ("Ωπ", "Symbol"),
+        ("Total", formatter.font),
+    ]
@@ -8,10 +8,16 @@ import pytest
 import os
 import sys
 from unittest.mock import patch, MagicMock
-from PyQt6.QtGui import QPixmap, QImage
+from PyQt6.QtGui import QGuiApplication, QPixmap, QImage
 
 from stmt_obfuscator.output_generator.pdf_formatter import PDFFormatter
-from stmt_obfuscator.output_generator.pdf_preview import PDFPreviewGenerator
+from stmt_obfuscator.output_generator.pdf_preview import (
+    PDFPreviewGenerator,
+    PDFPreviewRenderer,
+    _is_grayscale,
+    _render_page,
+    _render_pages,
+)
 
 
 @pytest.fixture
@@ -85,6 +91,393 @@ def test_generate_preview(sample_document):
             assert len(pixmaps) > 0
 
 
+def test_generate_preview_cache(sample_document):
+    """Test that repeated previews are served from the cache."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        preview_generator = PDFPreviewGenerator(cache_size=1)
+
+        with patch.object(
+            preview_generator.pdf_formatter,
+            "format_document",
+            wraps=preview_generator.pdf_formatter.format_document,
+        ) as format_document:
+            first = preview_generator.generate_preview(sample_document)
+            second = preview_generator.generate_preview(sample_document)
+            assert first == second
+            assert format_document.call_count == 1
+
+            # A different DPI is a separate entry and evicts the first one,
+            # but the formatted document is reused
+            preview_generator.generate_preview(sample_document, dpi=72)
+            assert [dpi for _, dpi, _ in preview_generator._pixmap_cache] == [72]
+            preview_generator.generate_preview(sample_document)
+            assert [dpi for _, dpi, _ in preview_generator._pixmap_cache] == [150]
+            assert format_document.call_count == 1
+
+            # The preview file reuses the formatted document too
+            temp_path = preview_generator.generate_preview_file(sample_document)
+            os.unlink(temp_path)
+            assert format_document.call_count == 1
+
+            # A different document is formatted again
+            other_document = dict(sample_document, full_text="Other")
+            preview_generator.generate_preview(other_document)
+            assert format_document.call_count == 2
+
+            # Alternating between the two documents reuses both formats
+            preview_generator.generate_preview(sample_document, dpi=72)
+            preview_generator.generate_preview(other_document, dpi=72)
+            assert format_document.call_count == 2
+
+            # Clearing the cache forces a re-format
+            preview_generator.clear_cache()
+            preview_generator.generate_preview(sample_document)
+            assert format_document.call_count == 3
+
+
+def test_generate_preview_quality(sample_document):
+    """Test that fast previews are capped at the screen resolution."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap), \
+         patch('stmt_obfuscator.output_generator.pdf_preview._screen_dpi', return_value=96):
+
+        preview_generator = PDFPreviewGenerator()
+
+        preview_generator.generate_preview(sample_document, dpi=300, quality="fast")
+        preview_generator.generate_preview(sample_document, dpi=72, quality="fast")
+        preview_generator.generate_preview(sample_document, dpi=300)
+        assert [dpi for _, dpi, _ in preview_generator._pixmap_cache] == [96, 72, 300]
+
+        # Unknown qualities are rejected
+        assert preview_generator.generate_preview(sample_document, quality="best") == []
+
+
+def test_post_process_hook(sample_document):
+    """Test that every rendered page passes through _post_process."""
+    processed = []
+
+    class MaskingPreviewGenerator(PDFPreviewGenerator):
+        def _post_process(self, buf, page_num):
+            buf[:10, :10] = 0
+            processed.append((page_num, buf.shape, buf[0, 0].max()))
+            return buf
+
+    mock_qpixmap = MagicMock(spec=QPixmap)
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        # Both the in-process and the worker process paths are covered
+        for threshold in (100, 1):
+            processed.clear()
+            preview_generator = MaskingPreviewGenerator(
+                parallel_page_threshold=threshold, force_grayscale=True
+            )
+            pixmaps = preview_generator.generate_preview(sample_document, dpi=72)
+
+            assert len(processed) == len(pixmaps) > 0
+            assert [page_num for page_num, _, _ in processed] == list(range(len(pixmaps)))
+            assert all(len(shape) == 2 for _, shape, _ in processed)
+            assert all(value == 0 for _, _, value in processed)
+
+
+def test_preview_backend():
+    """Test selecting the preview rasterizer."""
+    with pytest.raises(ValueError):
+        PDFPreviewGenerator(backend="ghostscript")
+
+    # Without pypdfium2, previews fall back to PyMuPDF
+    with patch('stmt_obfuscator.output_generator.pdf_preview.pdfium', None):
+        assert PDFPreviewGenerator(backend="pdfium").backend == "mupdf"
+
+
+def test_generate_preview_pdfium(sample_document):
+    """Test rendering previews with PDFium."""
+    pytest.importorskip("pypdfium2")
+    mock_qpixmap = MagicMock(spec=QPixmap)
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        pdfium_generator = PDFPreviewGenerator(backend="pdfium")
+        mupdf_generator = PDFPreviewGenerator()
+
+        pixmaps = pdfium_generator.generate_preview(sample_document, dpi=72)
+        assert len(pixmaps) == len(
+            mupdf_generator.generate_preview(sample_document, dpi=72)
+        )
+
+
+def test_generate_preview_disk_cache(sample_document):
+    """Test that previews are reused across generators through the disk cache."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap), \
+         tempfile.TemporaryDirectory() as cache_dir:
+
+        first_generator = PDFPreviewGenerator(disk_cache_dir=cache_dir)
+        pixmaps = first_generator.generate_preview(sample_document, dpi=72)
+
+        # The pages are stored under the document hash and render settings
+        document_key = PDFPreviewGenerator._document_key(sample_document)
+        settings_key = first_generator._render_settings_key()
+        preview_dir = Path(cache_dir) / document_key / f"72_mupdf_{settings_key}"
+        page_paths = sorted(preview_dir.glob("page_*.png"))
+        assert len(page_paths) == len(pixmaps) > 0
+        with fitz.open(page_paths[0]) as image:
+            assert image[0].rect.width > 0
+
+        # A new generator loads the pages instead of formatting the document
+        second_generator = PDFPreviewGenerator(disk_cache_dir=cache_dir)
+        with patch.object(second_generator.pdf_formatter, "format_document") as format_document:
+            assert len(second_generator.generate_preview(sample_document, dpi=72)) == len(pixmaps)
+            format_document.assert_not_called()
+
+        # Previews are evicted once the cache exceeds its size limit, but
+        # previews still being written are left alone
+        staging_dir = preview_dir.parent / ".tmp_staging"
+        staging_dir.mkdir()
+        (staging_dir / "page_0000.png").write_bytes(b"partial")
+        small_generator = PDFPreviewGenerator(
+            disk_cache_dir=cache_dir, max_disk_cache_bytes=1
+        )
+        small_generator.generate_preview(sample_document, dpi=100)
+        assert not preview_dir.exists()
+        assert staging_dir.exists()
+
+
+def test_disk_cache_formatter_settings(sample_document):
+    """Test that the disk cache keeps previews for different formatters apart."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+    document = dict(sample_document, full_text="\n".join(["Line"] * 100))
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap), \
+         tempfile.TemporaryDirectory() as cache_dir:
+
+        small_generator = PDFPreviewGenerator(
+            pdf_formatter=PDFFormatter(font_size=8), disk_cache_dir=cache_dir
+        )
+        large_generator = PDFPreviewGenerator(
+            pdf_formatter=PDFFormatter(font_size=24), disk_cache_dir=cache_dir
+        )
+        assert small_generator._render_settings_key() != large_generator._render_settings_key()
+
+        small_pages = small_generator.generate_preview(document, dpi=72)
+        large_pages = large_generator.generate_preview(document, dpi=72)
+        fresh_pages = PDFPreviewGenerator(
+            pdf_formatter=PDFFormatter(font_size=24)
+        ).generate_preview(document, dpi=72)
+
+    assert len(large_pages) == len(fresh_pages)
+    assert len(large_pages) > len(small_pages)
+
+
+def test_disk_cache_pixels(sample_document):
+    """Test that previews loaded from the disk cache match a fresh render."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QGuiApplication.instance() or QGuiApplication([])
+    document = dict(sample_document, full_text="\n".join(["Line"] * 200))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        fresh = PDFPreviewGenerator().generate_preview(document, dpi=72)
+        PDFPreviewGenerator(disk_cache_dir=cache_dir).generate_preview(document, dpi=72)
+
+        cached = PDFPreviewGenerator(disk_cache_dir=cache_dir).generate_preview(
+            document, dpi=72
+        )
+
+    assert len(cached) == len(fresh) > 1
+    for cached_pixmap, fresh_pixmap in zip(cached, fresh):
+        assert cached_pixmap.toImage() == fresh_pixmap.toImage()
+
+
+def test_iter_preview(sample_document):
+    """Test generating preview pages lazily."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+    document = dict(sample_document, full_text="\n".join(["Line"] * 200))
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        preview_generator = PDFPreviewGenerator()
+
+        # A partially consumed preview is not cached
+        pages = preview_generator.iter_preview(document, dpi=72)
+        assert next(pages) is mock_qpixmap
+        pages.close()
+        assert not preview_generator._pixmap_cache
+
+        # A fully consumed preview is cached
+        pixmaps = list(preview_generator.iter_preview(document, dpi=72))
+        assert len(pixmaps) > 1
+        assert len(preview_generator._pixmap_cache) == 1
+        assert preview_generator.generate_preview(document, dpi=72) == pixmaps
+
+
+def test_render_pages():
+    """Test rendering pages of a serialized PDF to raw samples."""
+    pdf_doc = fitz.open()
+    pdf_doc.new_page(width=72, height=144)
+    pdf_doc.new_page(width=144, height=72)
+    pdf_bytes = pdf_doc.tobytes()
+    pdf_doc.close()
+
+    rendered = _render_pages(pdf_bytes, [1, 0], 2.0)
+
+    assert [(width, height) for width, height, _, _, _ in rendered] == [
+        (288, 144),
+        (144, 288),
+    ]
+    for width, height, stride, components, samples in rendered:
+        # Blank pages have no color and are rendered in grayscale
+        assert components == 1
+        assert len(samples) == stride * height
+
+
+def test_render_page_colorspace():
+    """Test that only pages with color are rendered in RGB."""
+    pdf_doc = fitz.open()
+    page = pdf_doc.new_page(width=100, height=100)
+    page.insert_text((10, 50), "Black text")
+    matrix = fitz.Matrix(1, 1)
+
+    assert _is_grayscale(page)
+    assert _render_page(page, matrix).n == 1
+
+    page.draw_rect(fitz.Rect(10, 60, 90, 90), color=(1, 0, 0), fill=(1, 0, 0))
+    assert not _is_grayscale(page)
+    assert _render_page(page, matrix).n == 3
+    assert _render_page(page, matrix, force_grayscale=True).n == 1
+    pdf_doc.close()
+
+
+def test_generate_preview_parallel(sample_document):
+    """Test that large documents are rasterized in worker processes."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        preview_generator = PDFPreviewGenerator(parallel_page_threshold=1)
+
+        with patch.object(
+            preview_generator,
+            "_render_parallel",
+            wraps=preview_generator._render_parallel,
+        ) as render_parallel:
+            pixmaps = preview_generator.generate_preview(sample_document, dpi=72)
+
+        assert render_parallel.call_count == 1
+        assert len(pixmaps) > 0
+        assert all(pixmap is mock_qpixmap for pixmap in pixmaps)
+
+
+def test_preview_renderer(sample_document):
+    """Test rendering the first page immediately and the rest in the background."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+    # Enough lines for the document to span several pages
+    document = dict(sample_document, full_text="\n".join(["Line"] * 200))
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        renderer = PDFPreviewRenderer()
+        renderer._pool = MagicMock()
+        ready = []
+        finished = []
+        renderer.pageReady.connect(lambda page_num, pixmap: ready.append(page_num))
+        renderer.finished.connect(lambda: finished.append(True))
+
+        page_count = renderer.render(document, dpi=72)
+
+        # Only the first page is rendered synchronously
+        assert page_count > 1
+        assert ready == [0]
+        assert not finished
+
+        # Run the queued background task in this thread
+        task = renderer._pool.start.call_args[0][0]
+        task.run()
+        assert ready == list(range(page_count))
+        assert finished == [True]
+
+
+def test_preview_renderer_cancel(sample_document):
+    """Test that pages of a cancelled preview are not delivered."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+    document = dict(sample_document, full_text="\n".join(["Line"] * 200))
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        renderer = PDFPreviewRenderer()
+        renderer._pool = MagicMock()
+        ready = []
+        renderer.pageReady.connect(lambda page_num, pixmap: ready.append(page_num))
+
+        renderer.render(document, dpi=72)
+        task = renderer._pool.start.call_args[0][0]
+        renderer.cancel()
+        task.run()
+        assert ready == [0]
+
+
+def test_preview_renderer_cache(sample_document):
+    """Test that completed previews are cached and delivered at once."""
+    mock_qpixmap = MagicMock(spec=QPixmap)
+    document = dict(sample_document, full_text="\n".join(["Line"] * 200))
+
+    with patch('stmt_obfuscator.output_generator.pdf_preview.QImage'), \
+         patch('stmt_obfuscator.output_generator.pdf_preview.QPixmap.fromImage', return_value=mock_qpixmap):
+
+        renderer = PDFPreviewRenderer()
+        renderer._pool = MagicMock()
+        page_count = renderer.render(document, dpi=72)
+        renderer._pool.start.call_args[0][0].run()
+        assert len(renderer.preview_generator._pixmap_cache) == 1
+
+        ready = []
+        finished = []
+        renderer.pageReady.connect(lambda page_num, pixmap: ready.append(page_num))
+        renderer.finished.connect(lambda: finished.append(True))
+        renderer._pool.reset_mock()
+
+        # The cached preview is delivered without a background task
+        assert renderer.render(document, dpi=72) == page_count
+        assert ready == list(range(page_count))
+        assert finished == [True]
+        renderer._pool.start.assert_not_called()
+
+        # Pages are rasterized with PyMuPDF, so they are never served as the
+        # output of another backend
+        pdfium_renderer = PDFPreviewRenderer(PDFPreviewGenerator())
+        pdfium_renderer.preview_generator.backend = "pdfium"
+        pdfium_renderer._pool = MagicMock()
+        pdfium_renderer.render(document, dpi=72)
+        pdfium_renderer._pool.start.call_args[0][0].run()
+        assert [
+            backend for _, _, backend in pdfium_renderer.preview_generator._pixmap_cache
+        ] == ["mupdf"]
+
+
+def test_formatted_bytes_merge_content_streams(sample_document):
+    """Test that previews render pages with a single content stream."""
+    preview_generator = PDFPreviewGenerator()
+
+    pdf_bytes = preview_generator._get_formatted_bytes(sample_document)
+
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+        assert all(len(page.get_contents()) == 1 for page in pdf_doc)
+
+
 def test_generate_preview_file(sample_document):
     """Test generating a temporary PDF file for preview."""
     preview_generator = PDFPreviewGenerator()
@@ -1,10 +1,27 @@
 """Tests for the PDF parser module."""
 
+from dataclasses import asdict
 from unittest.mock import MagicMock, patch
 
+import fitz
 import pytest
 
-from stmt_obfuscator.pdf_parser.parser import PDFParser
+from stmt_obfuscator.pdf_parser.parser import PDFParser, TextBlock, TextBlockArray
+
+
+def _mock_get_text(text_dict):
+    """Create a get_text mock returning the blocks for "dict" and the text otherwise."""
+    plain_text = " ".join(
+        span["text"]
+        for block in text_dict["blocks"]
+        for line in block["lines"]
+        for span in line["spans"]
+    )
+
+    def get_text(option="text", **kwargs):
+        return text_dict if option == "dict" else plain_text
+
+    return get_text
 
 
 @pytest.fixture
@@ -21,6 +38,10 @@ def mock_pdf_document():
         "creator": "PDF Generator",
     }
 
+    # Mock document state
+    mock_doc.is_encrypted = False
+    mock_doc.is_damaged = False
+
     # Mock page count
     mock_doc.__len__ = lambda self: 2
 
@@ -69,6 +90,12 @@ def mock_pdf_document():
         ]
     }
 
+    for page in (page1, page2):
+        page.get_text.side_effect = _mock_get_text(page.get_text.return_value)
+        page.rect.width = 612
+        page.rect.height = 792
+        page.widgets.return_value = []
+
     mock_doc.__iter__ = lambda self: iter([page1, page2])
 
     return mock_doc
@@ -146,6 +173,153 @@ def test_extract_text(mock_open, mock_pdf_document, tmp_path):
     assert text_blocks[1].bbox == (10, 10, 300, 30)
 
 
+def test_extract_text_parallel(tmp_path):
+    """Test that extracting pages in worker processes gives the same blocks."""
+    pdf_path = tmp_path / "statement.pdf"
+    document = fitz.open()
+    for page_num in range(3):
+        page = document.new_page()
+        page.insert_text((72, 60), "Account Summary", fontsize=14, fontname="hebo")
+        page.insert_text((72, 120), f"Balance on page {page_num + 1}: 100.00")
+        page.insert_text((72, page.rect.height - 30), f"Page {page_num + 1}")
+    document.save(pdf_path)
+    document.close()
+
+    parser = PDFParser()
+    assert parser.load_pdf(str(pdf_path))
+    with patch("stmt_obfuscator.pdf_parser.parser.EXTRACTION_CACHE_SIZE", 0):
+        sequential = [asdict(block) for block in parser.extract_text()]
+
+        with patch(
+            "stmt_obfuscator.pdf_parser.parser.PARALLEL_EXTRACTION_MIN_PAGES", 1
+        ):
+            parallel = [asdict(block) for block in parser.extract_text()]
+    parser.close()
+
+    assert parallel == sequential
+    assert [block["page"] for block in sequential] == [1, 1, 1, 2, 2, 2, 3, 3, 3]
+    assert sequential[0]["block_type"] == "header"
+    assert parser.text_blocks[0].is_bold
+    assert not parser.text_blocks[1].is_bold
+    assert sequential[2]["block_type"] == "footer"
+
+
+def test_extract_text_cache(tmp_path):
+    """Test that parsing an unchanged file again reuses its text spans."""
+    pdf_path = tmp_path / "statement.pdf"
+    document = fitz.open()
+    document.new_page().insert_text((72, 72), "Closing Balance: 100.00")
+    document.save(pdf_path)
+    document.close()
+
+    first = PDFParser()
+    assert first.load_pdf(str(pdf_path))
+    expected = [asdict(block) for block in first.extract_text()]
+    first.close()
+
+    second = PDFParser()
+    assert second.load_pdf(str(pdf_path))
+    with patch("stmt_obfuscator.pdf_parser.parser._page_spans") as mock_page_spans:
+        blocks = [asdict(block) for block in second.extract_text()]
+    second.close()
+
+    mock_page_spans.assert_not_called()
+    assert blocks == expected
+
+
+def test_identify_sections():
+    """Test that styled blocks containing a keyword start a new section."""
+    parser = PDFParser()
+    parser.text_blocks = [
+        TextBlock(page=1, text="Statement", bbox=(0, 0, 10, 10), size=9),
+        TextBlock(page=1, text="ACCOUNT SUMMARY", bbox=(0, 0, 10, 10), size=14),
+        TextBlock(page=1, text="Opening balance", bbox=(0, 0, 10, 10), size=9),
+        TextBlock(
+            page=1,
+            text="Electronic Transactions",
+            bbox=(0, 0, 10, 10),
+            flags=fitz.TEXT_FONT_BOLD,
+        ),
+    ]
+
+    parser._identify_sections()
+
+    assert [block.section for block in parser.text_blocks] == [
+        "unknown",
+        "account_summary",
+        "account_summary",
+        "transactions",
+    ]
+    assert parser.document_structure.sections == {
+        "unknown": [0],
+        "account_summary": [1, 2],
+        "transactions": [3],
+    }
+
+
+def test_text_block_array():
+    """Test that the block arrays follow the text block list."""
+    parser = PDFParser()
+    parser.text_blocks = [
+        TextBlock(
+            page=1,
+            text="Bank",
+            bbox=(10, 10, 100, 30),
+            size=14,
+            flags=fitz.TEXT_FONT_BOLD | fitz.TEXT_FONT_ITALIC,
+        ),
+        TextBlock(page=2, text="Total", bbox=(20, 40, 80, 55), size=10),
+    ]
+
+    blocks = parser._blocks_as_array()
+    assert isinstance(blocks, TextBlockArray)
+    assert len(blocks) == 2
+    assert blocks.bbox.tolist() == [[10, 10, 100, 30], [20, 40, 80, 55]]
+    assert blocks.page.tolist() == [1, 2]
+    assert blocks.is_bold.tolist() == [True, False]
+    assert blocks.is_italic.tolist() == [True, False]
+    assert parser._blocks_as_array() is blocks
+    assert parser._page_block_indices(2).tolist() == [1]
+    assert parser._page_block_indices(3).tolist() == []
+
+    # Replacing the list rebuilds the arrays
+    parser.text_blocks = []
+    assert len(parser._blocks_as_array()) == 0
+    assert parser._blocks_as_array().bbox.shape == (0, 4)
+
+
+def test_group_blocks_by_rows():
+    """Test that rows are measured from their first block."""
+    parser = PDFParser()
+    blocks = [
+        TextBlock(page=1, text="b", bbox=(50, 4, 60, 10)),
+        TextBlock(page=1, text="a", bbox=(10, 0, 20, 10)),
+        TextBlock(page=1, text="c", bbox=(10, 8, 20, 18)),
+        TextBlock(page=1, text="d", bbox=(30, 12.9, 40, 20)),
+        TextBlock(page=1, text="e", bbox=(10, 40, 20, 50)),
+    ]
+
+    assert parser._group_blocks_by_rows(blocks) == [[1, 0], [2, 3], [4]]
+    assert parser._group_blocks_by_rows([]) == []
+
+
+def test_calculate_text_density():
+    """Test that large dense regions are found without deep recursion."""
+    parser = PDFParser()
+    blocks = [
+        TextBlock(page=1, text="Dense", bbox=(0, y + 2, 3000, y + 18))
+        for y in range(0, 3000, 20)
+    ]
+    blocks.append(TextBlock(page=1, text="Note", bbox=(0, 3100, 20, 3110)))
+
+    density = parser._calculate_text_density(blocks, 3000, 3200)
+
+    assert density["grid_dimensions"] == (151, 161)
+    assert density["high_density_regions"] == [
+        {"bbox": (0, 0, 3020, 3000), "size": 151 * 150, "avg_density": 1.0}
+    ]
+
+
 def test_close():
     """Test closing the PDF document."""
     parser = PDFParser()
@@ -183,6 +357,27 @@ def test_validate_pdf_structure(mock_open, mock_pdf_document, tmp_path):
     assert "validation_results" in parser.document_structure.__dict__
 
 
+def test_extract_text_without_text(tmp_path):
+    """Test that a document without text gets a validation warning."""
+    pdf_path = tmp_path / "scan.pdf"
+    document = fitz.open()
+    document.new_page().draw_rect(fitz.Rect(72, 72, 200, 200))
+    document.save(pdf_path)
+    document.close()
+
+    parser = PDFParser()
+    assert parser.load_pdf(str(pdf_path))
+    assert parser.document_structure.validation_results["warnings"] == []
+
+    assert parser.extract_text() == []
+    parser.extract_text()
+    parser.close()
+
+    assert parser.document_structure.validation_results["warnings"] == [
+        "PDF may not contain extractable text"
+    ]
+
+
 @patch("fitz.open")
 def test_detect_tables(mock_open, mock_pdf_document, tmp_path):
     """Test detecting tables in a PDF file."""
@@ -2,9 +2,12 @@
 Tests for the PII detection module.
 """
 
+import json
+
 import pytest
 from unittest.mock import patch, MagicMock
 
+from stmt_obfuscator.config import OLLAMA_KEEP_ALIVE
 from stmt_obfuscator.pii_detection.detector import PIIDetector
 
 
@@ -42,12 +45,16 @@ def test_detector_initialization():
     assert detector.confidence_threshold == 0.85
 
 
-@patch('requests.post')
+@patch('requests.Session.post')
 def test_detect_pii(mock_post, mock_ollama_response):
     """Test PII detection with a mock response."""
     # Configure the mock
     mock_response = MagicMock()
-    mock_response.json.return_value = {"response": mock_ollama_response}
+    mock_response.iter_lines.return_value = [
+        json.dumps({"response": mock_ollama_response[:40], "done": False}).encode(),
+        b"",
+        json.dumps({"response": mock_ollama_response[40:], "done": True}).encode(),
+    ]
     mock_response.raise_for_status.return_value = None
     mock_post.return_value = mock_response
     
@@ -73,14 +80,16 @@ def test_detect_pii(mock_post, mock_ollama_response):
     assert args[0] == "http://test-host/api/generate"
     assert kwargs["json"]["model"] == "test-model"
     assert "Bank statement text:" in kwargs["json"]["prompt"]
+    assert kwargs["json"]["keep_alive"] == OLLAMA_KEEP_ALIVE
+    assert kwargs["json"]["stream"] and kwargs["stream"]
 
 
-@patch('requests.post')
+@patch('requests.Session.post')
 def test_confidence_threshold_filtering(mock_post):
     """Test that entities below the confidence threshold are filtered out."""
     # Configure the mock with a response containing entities with different confidence levels
     mock_response = MagicMock()
-    mock_response.json.return_value = {"response": """
+    mock_response.iter_lines.return_value = [json.dumps({"response": """
     {
       "entities": [
         {
@@ -99,7 +108,7 @@ def test_confidence_threshold_filtering(mock_post):
         }
       ]
     }
-    """}
+    """, "done": True}).encode()]
     mock_response.raise_for_status.return_value = None
     mock_post.return_value = mock_response
     
@@ -112,4 +121,78 @@ def test_confidence_threshold_filtering(mock_post):
     
     # Verify that only the high-confidence entity is included
     assert len(result["entities"]) == 1
-    assert result["entities"][0]["type"] == "PERSON_NAME"
\ No newline at end of file
+    assert result["entities"][0]["type"] == "PERSON_NAME"
+
+
+def test_detect_pii_batch():
+    """Test that batch detection returns one result per text, in order."""
+    detector = PIIDetector(model="test-model", host="http://test-host")
+
+    def mock_send_to_ollama(prompt):
+        text = prompt.rsplit("\n", 1)[1]
+        return f'{{"entities": [{{"type": "PERSON_NAME", "text": "{text}"}}]}}'
+
+    texts = [f"Name {i}" for i in range(10)]
+    with patch.object(detector, "_send_to_ollama", side_effect=mock_send_to_ollama):
+        results = detector.detect_pii_batch(texts)
+
+    assert [result["entities"][0]["text"] for result in results] == texts
+
+
+@patch('requests.Session.close')
+def test_close(mock_close):
+    """Test that closing the detector closes its HTTP session."""
+    detector = PIIDetector(model="test-model", host="http://test-host")
+    detector.close()
+
+    mock_close.assert_called_once()
+
+
+def test_detect_pii_marshalled():
+    """Test detecting PII in several texts per prompt."""
+    detector = PIIDetector(model="test-model", host="http://test-host")
+    detector.confidence_threshold = 0.5
+    texts = ["John Doe", "no PII here", "Jane Roe"]
+
+    def mock_send_to_ollama(prompt):
+        assert "=== CHUNK 0 ===" in prompt
+        if "=== CHUNK 1 ===" in prompt:
+            return """{"chunks": [
+                {"id": 0, "entities": [
+                    {"type": "PERSON_NAME", "text": "John Doe", "start": 0,
+                     "end": 8, "confidence": 0.9},
+                    {"type": "EMAIL", "text": "Doe", "start": 5, "end": 8,
+                     "confidence": 0.1}
+                ]},
+                {"id": 7, "entities": [{"type": "EMAIL", "text": "x"}]}
+            ]}"""
+        return """{"chunks": [{"id": 0, "entities": [
+            {"type": "PERSON_NAME", "text": "Jane Roe", "start": 0, "end": 8}
+        ]}]}"""
+
+    with patch.object(
+        detector, "_send_to_ollama", side_effect=mock_send_to_ollama
+    ) as mock_send:
+        results = detector.detect_pii_marshalled(
+            texts, rows_per_call=2, offsets=[0, 9, 21]
+        )
+
+    assert mock_send.call_count == 2
+    assert [len(result["entities"]) for result in results] == [1, 0, 1]
+    first, last = results[0]["entities"][0], results[2]["entities"][0]
+    assert (first["start"], first["end"]) == (0, 8)
+    assert (last["start"], last["end"]) == (21, 29)
+
+
+def test_create_prompt_prefix():
+    """Test that prompts share the instructions and order the RAG context."""
+    detector = PIIDetector(model="test-model", host="http://test-host")
+
+    plain = detector._create_prompt("Statement A")
+    first = detector._create_prompt("Statement B", {"b": 2, "a": 1})
+    second = detector._create_prompt("Statement B", {"a": 1, "b": 2})
+
+    instructions = plain[: plain.index("\nBank statement text:")]
+    assert first.startswith(instructions)
+    assert first == second
+    assert first.index("a: 1") < first.index("b: 2") < first.index("Statement B")
@@ -20,7 +20,23 @@ class TestPIIDetectorUnit:
         assert pii_detector is not None
         assert isinstance(pii_detector, PIIDetector)
         assert hasattr(pii_detector, 'detect_pii')
-        
+
+    def test_parse_response(self, pii_detector):
+        """Test parsing bare and embedded JSON responses."""
+        pii_detector.confidence_threshold = 0.5
+        entities = [
+            {"type": "PERSON_NAME", "text": "John Doe", "confidence": 0.9},
+            {"type": "EMAIL", "text": "a@b.com", "confidence": 0.2},
+        ]
+        response = json.dumps({"entities": entities})
+
+        for text in (response, f"Here is the result:\n{response}\nDone."):
+            result = pii_detector._parse_response(text)
+            assert result == {"entities": entities[:1]}
+
+        assert pii_detector._parse_response("No PII found.") == {"entities": []}
+        assert pii_detector._parse_response("{not json}") == {"entities": []}
+
     def test_detect_pii_with_sample_text(self, pii_detector, sample_text):
         """Test PII detection with a sample text."""
         # Skip if Ollama is not available
@@ -0,0 +1,69 @@
+"""
+Tests for the PII management module.
+"""
+
+from stmt_obfuscator.pii_management.manager import PIIManager
+
+
+def make_manager():
+    """Return a manager holding three processed entities."""
+    manager = PIIManager(confidence_threshold=0.5)
+    manager.process_entities(
+        [
+            {"type": "PERSON_NAME", "text": "John Doe", "confidence": 0.9},
+            {"type": "EMAIL", "text": "a@b.com", "confidence": 0.2},
+            {"type": "PHONE_NUMBER", "text": "(555) 123-4567", "confidence": 0.9},
+            {"type": "ACCOUNT_NUMBER", "text": "1234567890", "confidence": 0.9},
+        ]
+    )
+    return manager
+
+
+def test_process_entities():
+    """Test that low-confidence entities are dropped and the rest numbered."""
+    manager = make_manager()
+
+    assert [entity["id"] for entity in manager.pii_entities] == [
+        "entity_0",
+        "entity_1",
+        "entity_2",
+    ]
+    assert manager.get_replacement_map() == {
+        "John Doe": "XXXX XXX",
+        "(555) 123-4567": "(XXX) XXX-XXXX",
+        "1234567890": "XXXX-XXXX-XXXX-7890",
+    }
+
+
+def test_update_and_remove_entity():
+    """Test finding entities by ID after updates and removals."""
+    manager = make_manager()
+
+    assert manager.update_entity("entity_1", {"text": "555-123-4567"})
+    assert manager.pii_entities[1]["text"] == "555-123-4567"
+    assert not manager.update_entity("entity_9", {"text": "x"})
+
+    assert manager.remove_entity("entity_0")
+    assert not manager.remove_entity("entity_0")
+    assert manager.update_entity("entity_2", {"type": "PERSON_NAME"})
+    assert manager.pii_entities[1]["replacement"] == "XXXXXXXXXX"
+
+    # New IDs are numbered from the entity count, so they can repeat an
+    # existing ID; the first entity with the ID is found until it is removed
+    assert manager.add_entity({"type": "EMAIL", "text": "c@d.com"}) == "entity_2"
+    assert manager.remove_entity("entity_2")
+    assert [entity["text"] for entity in manager.pii_entities] == [
+        "555-123-4567",
+        "c@d.com",
+    ]
+    assert manager.remove_entity("entity_2")
+    assert [entity["id"] for entity in manager.pii_entities] == ["entity_1"]
+
+
+def test_replacement_cache_cleared():
+    """Test that cached replacements do not outlive the processed entities."""
+    manager = make_manager()
+    assert ("PERSON_NAME", "John Doe", "PERSON", "X") in manager._replacement_cache
+
+    manager.process_entities([{"type": "EMAIL", "text": "a@b.com"}])
+    assert list(manager._replacement_cache) == [("EMAIL", "a@b.com", "EMAIL", "X")]
@@ -130,6 +130,31 @@ class TestRAGContextEnhancer:
         assert result["examples"][0]["type"] == "ACCOUNT_NUMBER"
         assert result["examples"][0]["text"] == "1234-5678-9012-3456"
 
+    def test_get_contexts(self, mock_rag_enhancer):
+        """Test get_contexts queries all chunks at once."""
+        mock_rag_enhancer.collection.query.return_value = {
+            "documents": [["pattern1"], [], ["pattern2"]],
+            "metadatas": [[{"type": "ACCOUNT_NUMBER"}], [], [{"type": "EMAIL"}]],
+            "distances": [[0.1], [], [0.3]]
+        }
+        
+        results = mock_rag_enhancer.get_contexts(["a", "b", "c"], top_k=1)
+        
+        mock_rag_enhancer.collection.query.assert_called_once_with(
+            query_texts=["a", "b", "c"],
+            n_results=1
+        )
+        assert results[1] is None
+        assert results[0]["patterns"] == [
+            {"type": "ACCOUNT_NUMBER", "pattern": "pattern1", "score": 0.1}
+        ]
+        assert results[2]["patterns"] == [
+            {"type": "EMAIL", "pattern": "pattern2", "score": 0.3}
+        ]
+        
+        mock_rag_enhancer.collection.query.side_effect = Exception("Test exception")
+        assert mock_rag_enhancer.get_contexts(["a", "b"]) == [None, None]
+
     def test_get_context_exception(self, mock_rag_enhancer):
         """Test get_context with exception."""
         mock_rag_enhancer.collection.query.side_effect = Exception("Test exception")
@@ -171,6 +196,18 @@ class TestRAGContextEnhancer:
         assert kwargs["metadatas"] == [{"type": "ACCOUNT_NUMBER"}]
         assert "ids" in kwargs
 
+    def test_add_pattern_id(self, mock_rag_enhancer):
+        """Test that pattern IDs are stable and distinct per pattern."""
+        mock_rag_enhancer.add_pattern("pattern", "ACCOUNT_NUMBER")
+        mock_rag_enhancer.add_pattern("pattern", "ACCOUNT_NUMBER")
+        mock_rag_enhancer.add_pattern("pattren", "ACCOUNT_NUMBER")
+        
+        ids = [kwargs["ids"][0] for args, kwargs in mock_rag_enhancer.collection.add.call_args_list]
+        
+        assert ids[0] == "ACCOUNT_NUMBER_ea32457f01f32c01"
+        assert ids[0] == ids[1]
+        assert ids[0] != ids[2]
+
     def test_add_pattern_exception(self, mock_rag_enhancer):
         """Test add_pattern with exception."""
         mock_rag_enhancer.collection.add.side_effect = Exception("Test exception")
@@ -203,16 +240,18 @@ class TestRAGContextEnhancer:
         """Test initialize_knowledge_base success."""
         mock_rag_enhancer.collection.count.return_value = 0
         
-        # Spy on the add_pattern method to check if it's called
-        with patch.object(mock_rag_enhancer, 'add_pattern', wraps=mock_rag_enhancer.add_pattern) as spy:
-            # Make the spy return True
-            spy.return_value = True
-            
-            result = mock_rag_enhancer.initialize_knowledge_base()
-            
-            assert result is True
-            # There are 9 patterns in the default initialization
-            assert spy.call_count == 9
+        result = mock_rag_enhancer.initialize_knowledge_base()
+        
+        assert result is True
+        # All patterns are added with a single call
+        mock_rag_enhancer.collection.add.assert_called_once()
+        args, kwargs = mock_rag_enhancer.collection.add.call_args
+        
+        # There are 9 patterns in the default initialization
+        assert len(kwargs["documents"]) == 9
+        assert len(kwargs["metadatas"]) == 9
+        assert len(set(kwargs["ids"])) == 9
+        assert kwargs["metadatas"][0] == {"type": "ACCOUNT_NUMBER", "example": "1234-5678-9012-3456"}
 
     def test_initialize_knowledge_base_exception(self, mock_rag_enhancer):
         """Test initialize_knowledge_base with exception."""